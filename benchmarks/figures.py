@@ -0,0 +1,94 @@
+""" Figures of varying complexity used by benchmarks """
+
+import matplotlib.pyplot as plt
+import numpy as np
+from django_matplotlib.figures import FigureTemplate
+
+
+def plot_line():
+    """ Plots piecewise line """
+
+    fig, ax = plt.subplots()
+    ax.plot([1, 2, 3], [3, 2, 6])
+    return fig
+
+
+def plot_sine(points=100):
+    """ Plots sine function """
+
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 2 * np.pi, points)
+    ax.plot(x, np.sin(x))
+    return fig
+
+
+def plot_noisy_sine(points=1000000):
+    """ Plots a long noisy series """
+
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 100, points)
+    y = np.sin(x) + np.random.RandomState(0).normal(size=points)
+    ax.plot(x, y)
+    return fig
+
+
+def _sine_layout(fig):
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_xlim(0, 2 * np.pi)
+    ax.set_ylim(-1.1, 1.1)
+    ax.grid(True)
+    ax.set_xlabel('phase')
+    ax.set_ylabel('amplitude')
+    ax.set_title('Sine')
+
+
+def _sine_data(fig, shift=0):
+    x = np.linspace(0, 2 * np.pi, 100)
+    fig.axes[0].plot(x, np.sin(x + shift))
+
+
+def plot_shifted_sine(shift=0):
+    """ Plots shifted sine function, drawing the whole figure """
+
+    fig = plt.figure(layout='constrained')
+    _sine_layout(fig)
+    _sine_data(fig, shift)
+    return fig
+
+
+# the same figure, whose axes are drawn once
+plot_shifted_sine_template = FigureTemplate(_sine_layout, _sine_data,
+                                            layout='constrained')
+
+
+def image_plot():
+    """ plt.imshow demonstration """
+
+    delta = 0.025
+    x = y = np.arange(-3.0, 3.0, delta)
+    X, Y = np.meshgrid(x, y)
+    Z1 = np.exp(-X**2 - Y**2)
+    Z2 = np.exp(-(X - 1)**2 - (Y - 1)**2)
+    Z = (Z1 - Z2) * 2
+    fig, ax = plt.subplots()
+    ax.imshow(Z, interpolation='bilinear', cmap='RdYlGn',
+              origin='lower', extent=[-3, 3, -3, 3],
+              vmax=abs(Z).max(), vmin=-abs(Z).max())
+    return fig
+
+
+def contour_plot():
+    """ Contour plot demo """
+
+    delta = 0.025
+    x = np.arange(-3.0, 3.0, delta)
+    y = np.arange(-2.0, 2.0, delta)
+    X, Y = np.meshgrid(x, y)
+    Z1 = np.exp(-X**2 - Y**2)
+    Z2 = np.exp(-(X - 1)**2 - (Y - 1)**2)
+    Z = (Z1 - Z2) * 2
+    fig, ax = plt.subplots()
+    CS = ax.contour(X, Y, Z)
+    ax.clabel(CS, inline=1, fontsize=10)
+    ax.set_title('Contour plot')
+    return fig
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""Microbenchmarks of MatplotlibFigureField's hot paths.
+
+Measures cold (figure is rendered) and warm (figure is taken from the
+cache) field access for string and file outputs, png and svg formats,
+and figures of varying complexity (see `benchmarks/figures.py`), rendering
+of long series with and without decimation, renders of figure templates,
+as well as rendering of forms with many figure fields.
+
+Usage::
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --compare results.json --threshold 0.2
+
+Results are written as JSON. If `--compare` is given, the results are
+compared with previous ones and the script exits with status 1 when
+any benchmark became slower (or used more memory) than `threshold`.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                      'django_matplotlib.tests.test_settings')
+
+import django                                           # noqa
+django.setup()
+
+import matplotlib                                       # noqa
+# models of benchmarks are defined in this package (see create_model)
+import benchmarks                                       # noqa
+from django import forms                                # noqa
+from django.conf import settings                        # noqa
+from django.db import models                            # noqa
+from django.template import Context, Engine             # noqa
+from django_matplotlib.fields import (MatplotlibFigureField,  # noqa
+                                      defaults, figure_modules, render_cache)
+
+
+FIXTURES = {
+    'line': ('plot_line', {}),
+    'sine_10k': ('plot_sine', {'points': 10000}),
+    'imshow': ('image_plot', {}),
+    'contour': ('contour_plot', {}),
+}
+
+FORM_FIELDS = 20
+
+_models = dict()
+
+
+def create_model(name, fields):
+    """ Creates model whose figures are defined in benchmarks/figures.py """
+
+    if name not in _models:
+        class Meta:
+            app_label = 'django_matplotlib'
+        attrs = {'__module__': 'benchmarks', 'Meta': Meta}
+        attrs.update(fields)
+        _models[name] = type(name, (models.Model, ), attrs)
+    return _models[name]
+
+
+def cold_cache():
+    """ Drops all rendered figures and loaded figure modules """
+
+    render_cache.clear()
+    figure_modules.clear()
+    tmp_dir = os.path.join(settings.MEDIA_ROOT, defaults.DJANGO_MATPLOTLIB_TMP)
+    if os.path.isdir(tmp_dir):
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+
+
+def measure(func, setup=None, repeat=10):
+    """ Returns timing and memory statistics of func """
+
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'min_ms': min(times),
+            'median_ms': statistics.median(times),
+            'mean_ms': statistics.mean(times),
+            'peak_kb': peak / 1024,
+            'repeat': repeat}
+
+
+def field_benchmarks(repeat):
+    """ Yields (name, func, setup, repeat) of field access benchmarks """
+
+    for fixture, (figure, kwargs) in sorted(FIXTURES.items()):
+        for output_type in ('string', 'file'):
+            for output_format in ('png', 'svg'):
+                model = create_model(
+                    'Bench_%s_%s_%s' % (fixture, output_type, output_format),
+                    {'figure': MatplotlibFigureField(
+                        figure=figure, plt_kwargs=kwargs,
+                        output_type=output_type,
+                        output_format=output_format)})
+                name = '%s/%s/%s' % (fixture, output_type, output_format)
+                access = (lambda model: lambda: model.figure)(model)
+                yield 'get/cold/' + name, access, cold_cache, repeat
+                yield 'get/warm/' + name, access, access, repeat * 10
+
+
+def decimation_benchmarks(repeat):
+    """ Yields (name, func, setup, repeat) of long series rendering """
+
+    for method in (False, 'minmax', 'lttb'):
+        model = create_model(
+            'BenchDecimate_%s' % method,
+            {'figure': MatplotlibFigureField(figure='plot_noisy_sine',
+                                             decimate=method)})
+        access = (lambda model: lambda: model.figure)(model)
+        yield 'decimate/%s/noisy_sine_1m' % (method or 'none'), access,\
+            cold_cache, repeat
+
+
+def template_benchmarks(repeat):
+    """ Yields (name, func, setup, repeat) of figures differing in data """
+
+    for name, figure in (('full', 'plot_shifted_sine'),
+                         ('blit', 'plot_shifted_sine_template')):
+        model = create_model('BenchTemplate_%s' % name, {
+            'figure': MatplotlibFigureField(figure=figure,
+                                            instance_fields=('shift', ))})
+        shifts = iter(range(10 ** 6))
+
+        def access(model=model, shifts=shifts):
+            # each access renders the figure with new data
+            instance = model()
+            instance.shift = next(shifts)
+            return instance.figure
+
+        yield 'template/%s/shifted_sine' % name, access,\
+            render_cache.clear, repeat
+
+
+def form_benchmarks(repeat):
+    """ Yields (name, func, setup, repeat) of form rendering benchmarks """
+
+    model = create_model('BenchForm', {
+        'figure%s' % i: MatplotlibFigureField(figure='plot_sine',
+                                              plt_kwargs={'points': 100 + i})
+        for i in range(FORM_FIELDS)})
+    template = Engine().from_string('{{ form }}')
+
+    def render():
+        # form classes are built per request (e.g. by the admin)
+        form_class = forms.modelform_factory(model, fields='__all__')
+        return template.render(Context({'form': form_class()}))
+
+    name = 'form/%s_fields' % FORM_FIELDS
+    yield name + '/cold', render, cold_cache, repeat
+    yield name + '/warm', render, render, repeat
+
+
+def run(repeat, pattern=None):
+    results = dict()
+    for group in (field_benchmarks, decimation_benchmarks,
+                  template_benchmarks, form_benchmarks):
+        for name, func, setup, runs in group(repeat):
+            if pattern and pattern not in name:
+                continue
+            if setup is func:
+                # warm benchmark: the cache is filled once
+                func()
+                setup = None
+            results[name] = result = measure(func, setup, runs)
+            print('%-40s median %9.3f ms  peak %9.1f KiB' % (
+                name, result['median_ms'], result['peak_kb']),
+                file=sys.stderr)
+    return {
+        'meta': {'python': platform.python_version(),
+                 'django': django.get_version(),
+                 'matplotlib': matplotlib.__version__,
+                 'platform': platform.platform(),
+                 'timestamp': time.time()},
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """ Returns names of benchmarks which regressed compared to baseline """
+
+    regressions = []
+    for name, result in sorted(results['results'].items()):
+        previous = baseline['results'].get(name)
+        if not previous:
+            continue
+        for metric in ('median_ms', 'peak_kb'):
+            if previous[metric] and\
+                    result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(name)
+                print('REGRESSION %-40s %s: %.3f -> %.3f' % (
+                    name, metric, previous[metric], result[metric]),
+                    file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Number of runs of each (cold) benchmark.")
+    parser.add_argument('--filter', default=None,
+                        help="Run benchmarks whose names contain this string.")
+    parser.add_argument('--output', default=None,
+                        help="File to write JSON results to (default: stdout).")
+    parser.add_argument('--compare', default=None,
+                        help="JSON results to compare with.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed relative slowdown (default: 0.2).")
+    options = parser.parse_args()
+
+    results = run(options.repeat, options.filter)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, options.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
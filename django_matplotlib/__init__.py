@@ -1 +1,6 @@
-from django_matplotlib.fields import MatplotlibFigureField
\ No newline at end of file
+import django
+from django_matplotlib.fields import MatplotlibFigureField
+
+if django.VERSION < (3, 2):
+    # newer versions of Django find the app config automatically
+    default_app_config = 'django_matplotlib.apps.DjangoMatplotlibConfig'
@@ -0,0 +1,83 @@
+from django.contrib.admin.utils import label_for_field
+from django.contrib.admin.views.main import ChangeList
+from django.utils.html import format_html
+from django.utils.text import capfirst
+
+
+class FigureThumbnail:
+    """Column of admin changelists (`list_display`) which shows thumbnails
+    of a figure field, e.g.::
+
+        class MyModelAdmin(FigureThumbnailsMixin, admin.ModelAdmin):
+            list_display = ('name', FigureThumbnail('figure'))
+
+    Thumbnails are small low-resolution renders of the figure, cached
+    apart from its full-size renders (see
+    :meth:`django_matplotlib.fields.MatplotlibFigureField.get_thumbnails`).
+
+    :param field_name: Name of the `MatplotlibFigureField`.
+    :param width: Width of thumbnails in pixels.
+    :param height: Height of thumbnails in pixels.
+    :param dpi: Resolution of thumbnails.
+    :param description: Header of the column (the field's verbose name
+                        by default).
+    """
+
+    def __init__(self, field_name, width=None, height=None, dpi=None,
+                 description=None):
+        self.field_name = field_name
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.description = description
+        self.__name__ = field_name
+
+    @property
+    def short_description(self):
+        return self.description or capfirst(self.field_name.replace('_', ' '))
+
+    def get_thumbnails(self, instances):
+        if not instances:
+            return []
+        field = instances[0]._meta.get_field(self.field_name)
+        return field.get_thumbnails(instances, self.width, self.height,
+                                    self.dpi)
+
+    def __call__(self, obj):
+        fig_object = self.get_thumbnails([obj])[0]
+        if fig_object.error or not fig_object.source:
+            return ''
+        return format_html(
+            '<img src="data:{};base64,{}" width="{}" height="{}" alt="">',
+            fig_object.content_type, fig_object.source,
+            fig_object._width, fig_object._height)
+
+
+class FigureChangeList(ChangeList):
+    """ Changelist which renders thumbnails of all rows of a page at once """
+
+    def get_thumbnail_columns(self):
+        columns = []
+        for name in self.list_display:
+            column = label_for_field(name, self.model, self.model_admin,
+                                     return_attr=True)[1]
+            if isinstance(column, FigureThumbnail):
+                columns.append(column)
+        return columns
+
+    def get_results(self, request):
+        super().get_results(request)
+        rows = list(self.result_list)
+        for column in self.get_thumbnail_columns():
+            # cached by the field, so cells are rendered from the cache
+            column.get_thumbnails(rows)
+
+
+class FigureThumbnailsMixin:
+    """Mixin of :class:`django.contrib.admin.ModelAdmin` whose changelist
+    renders thumbnails (:class:`FigureThumbnail` columns) of all rows of
+    a page in a single batch.
+    """
+
+    def get_changelist(self, request, **kwargs):
+        return FigureChangeList
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class DjangoMatplotlibConfig(AppConfig):
     name = 'django_matplotlib'
+
+    def ready(self):
+        from django_matplotlib.sweeper import start_sweeper_thread
+        start_sweeper_thread()
     
@@ -0,0 +1,247 @@
+import os
+import time
+import threading
+import importlib.util
+from collections import OrderedDict
+
+
+class FigureModuleCache:
+    """Cache of loaded figure modules (e.g. `figures.py`).
+
+    A module is executed only once and re-executed only when the
+    file it was loaded from has changed. Changes are detected by
+    comparing file's mtime, size and inode. If `frozen` is `True`,
+    files aren't checked for changes after the first load
+    (recommended for production).
+    """
+
+    def __init__(self, frozen=False):
+        self.frozen = frozen
+        self._modules = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def load(self, path, name):
+        """Returns module loaded from `path`, re-executes it if needed."""
+
+        path = os.path.abspath(path)
+        with self._lock:
+            cached = self._modules.get(path)
+            if cached is not None and self.frozen:
+                return cached[1]
+            try:
+                stamp = self._stamp(path)
+            except OSError:
+                self._modules.pop(path, None)
+                raise ImportError("No such file: '%s'." % path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self._modules[path] = (stamp, module)
+            return module
+
+    def discard(self, path):
+        """ Makes the module be re-executed when it is loaded next time """
+
+        with self._lock:
+            self._modules.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        with self._lock:
+            self._modules.clear()
+
+
+class RenderCache:
+    """Thread-safe LRU cache of rendered figures with a memory budget.
+
+    Items are evicted in least recently used order when the total
+    size of cached items exceeds `max_bytes` or their number exceeds
+    `max_entries` (if not `None`). Items older than `ttl` seconds
+    (if not `None`) are considered expired.
+
+    Hits, misses, evictions and the total size of cached items are
+    counted and available through :meth:`stats`.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entries=None, ttl=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pop(self, key):
+        value, size, created = self._items.pop(key)
+        self._bytes -= size
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and self.ttl is not None and\
+                    time.monotonic() - item[2] > self.ttl:
+                self._pop(key)
+                self.evictions += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, size=0):
+        with self._lock:
+            if key in self._items:
+                self._pop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._items[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._items and (
+                    (self.max_bytes is not None and self._bytes > self.max_bytes) or
+                    (self.max_entries is not None and len(self._items) > self.max_entries)):
+                self._pop(next(iter(self._items)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._items:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'bytes': self._bytes,
+                    'entries': len(self._items), 'max_bytes': self.max_bytes}
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into a single call.
+
+    The first caller executes the function, others wait for it and
+    get the same result (or the same exception).
+    """
+
+    def __init__(self):
+        self._flights = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.result
+
+    def __len__(self):
+        return len(self._flights)
+
+
+class SharedCache:
+    """Rendered figures shared by processes and hosts through Django's
+    cache framework (e.g. Redis or memcached).
+
+    Values are stored in the cache `alias` (see `CACHES` setting) under
+    keys prefixed by `key_prefix` for `timeout` seconds (`None` means
+    forever). Counters (see :meth:`incr`) never expire; if a counter is
+    evicted anyway, it restarts from the current time in microseconds,
+    so values it had before aren't reused.
+    """
+
+    def __init__(self, alias='default', timeout=None,
+                 key_prefix='django_matplotlib'):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def make_key(self, key):
+        return '%s:%s' % (self.key_prefix, key)
+
+    def get(self, key, default=None):
+        return self.cache.get(self.make_key(key), default)
+
+    def set(self, key, value):
+        self.cache.set(self.make_key(key), value, timeout=self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    @staticmethod
+    def _get_initial_count():
+        # greater than values of a counter evicted earlier, unless it was
+        # incremented more than a million times per second
+        return int(time.time() * 1000000)
+
+    def get_counter(self, key):
+        """ Returns value of counter `key`, which is created if missing """
+
+        value = self.get(key)
+        if value is None:
+            self.cache.add(self.make_key(key), self._get_initial_count(),
+                           timeout=None)
+            value = self.get(key)
+        return value
+
+    def incr(self, key):
+        """ Atomically increments counter `key` and returns its value """
+
+        key = self.make_key(key)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # the counter doesn't exist (or was evicted)
+            value = self._get_initial_count()
+            if self.cache.add(key, value, timeout=None):
+                return value
+            return self.cache.incr(key)
@@ -1,12 +1,18 @@
 
-# This directory will be created within MEDIA_ROOT to store
-# temporary files of figures (if output_type='file').
+# This directory will be created within MEDIA_ROOT (or the root of
+# the field's storage) to store files of figures (if output_type='file').
 DJANGO_MATPLOTLIB_TMP = 'matplotlib_tmp'
 
 # Default home for matplotlib views (functions
 # which return matplotlib.Figure instance)
 DJANGO_MATPLOTLIB_MODULE = 'figures.py'
 
+# Figure modules are loaded once and re-executed only when
+# they are changed on disk (checked by mtime, size and inode).
+# If True, modules aren't checked for changes after the first
+# load (recommended for production).
+DJANGO_MATPLOTLIB_FROZEN = False
+
 
 # Matplotlib Field configurations
 DJANGO_MATPLOTLIB_FIG_DEFAULTS = {
@@ -21,21 +27,166 @@ DJANGO_MATPLOTLIB_FIG_DEFAULTS = {
     # output figure height (px)
     'fig_height':    240,
 
-    # either 'string' or 'file'
+    # figures are rendered at fig_width x fig_height pixels
+    # using this resolution (dots per inch)
+    'fig_dpi':       100,
+
+    # if True, figures are cropped to their content (savefig's
+    # bbox_inches='tight'); it costs an extra drawing pass and
+    # the size of cropped figures differs from fig_width x fig_height
+    'tight_bbox':    False,
+
+    # either 'string', 'file' or 'url'
     # if output_type='file' the figure will be stored
     # to a temporary file in MEDIA_ROOT/DJANGO_MATPLOTLIB_TMP/
     # if output_type='string' the figure will be embedded into
     # html, e.g. <img src="data:image/png;base64,..." />
+    # if output_type='url' the figure will be served by
+    # django_matplotlib.views.figure_view, e.g. <img src="/figures/..." />
+    # ('django_matplotlib.urls' should be included into your URLconf)
+    # if output_type='tiles' the figure will be shown by a zoomable
+    # viewer which loads tiles of the figure rendered on demand
+    # (e.g. for large images or heatmaps)
     'output_type':   'string',
 
-    # either 'png' or 'svg';
+    # size of tiles in pixels and maximum zoom level (zoom level z is
+    # made of 2**z by 2**z tiles) if output_type='tiles'
+    'tile_size':     256,
+    'max_zoom':      4,
+
+    # either 'png', 'svg', 'webp' or 'jpeg'
+    # ('webp' and 'jpeg' require Pillow);
     'output_format': 'png',
 
+    # options of output formats, e.g.
+    # {'quality': 80} ('webp' and 'jpeg', 1-100),
+    # {'lossless': True} ('webp'),
+    # {'compress_level': 9, 'optimize': True} ('png'),
+    # {'colors': 64} (quantize 'png' or 'webp' to 64 colors palette)
+    # (raster options require Pillow),
+    # {'precision': 2, 'minify': True} ('svg', round coordinates to
+    # 2 decimal digits, strip metadata, comments and whitespace)
+    'output_options': {},
+
+    # if True and output_type='file', gzip (.svg.gz) and brotli
+    # (.svg.br, requires brotli package) compressed copies of svg
+    # figures are saved, so they can be sent by a static file server
+    'precompress':   False,
+
+    # downsample lines and scatter plots to the output resolution
+    # before drawing: 'minmax' (or True), 'lttb' or False
+    'decimate':      False,
+
     # when output_type='file' and cleanup='True' temporary files
     # will be deleted at exit; if cleanup='False' temporary files
-    # will not be cleaned up.
-    'cleanup':       True
+    # will not be cleaned up. Files are named by a digest of the figure's
+    # code and output parameters, so set cleanup=False to reuse rendered
+    # files across restarts and processes.
+    'cleanup':       True,
+
+    # storage of figure files (if output_type='file'): None
+    # (default_storage), alias of a storage defined in STORAGES setting
+    # (Django 4.2+), storage instance or a callable which returns it.
+    # Files of remote storages (e.g. S3) are shared by all hosts and
+    # aren't cleaned up at exit.
+    'storage':       None,
+
+    # if True, figure views shouldn't use matplotlib.pyplot
+    # (e.g. use django_matplotlib.figures.subplots instead of
+    # plt.subplots); such figures are rendered concurrently
+    # in multithreaded servers. Otherwise, renders are serialized
+    # by a process-wide lock, since pyplot isn't thread-safe.
+    'threadsafe':    False
+}
+
+
+# Rendered figures are kept in a process-wide in-memory cache
+# shared by all fields. Least recently used figures are evicted
+# when the total size of cached figures exceeds `max_bytes` or their
+# number exceeds `max_entries` (None means no limit); figures older
+# than `ttl` seconds are re-rendered (None means never expire).
+DJANGO_MATPLOTLIB_RENDER_CACHE = {
+    'max_bytes':     32 * 1024 * 1024,
+    'max_entries':   None,
+    'ttl':           None
+}
+
+
+# Rendered figures can be shared by all processes and hosts through
+# Django's cache framework. If `alias` is a name of a cache defined in
+# CACHES setting (e.g. Redis or memcached), figures which aren't found
+# in the in-memory cache are looked up there, and rendered figures are
+# stored there for `timeout` seconds (None means forever) under keys
+# prefixed by `key_prefix`. Generations of models' data (see field's
+# `invalidate_on` argument) are kept there too; without the shared
+# cache, data changes invalidate renders of the changing process only,
+# so renders of fields with `invalidate_on` aren't shared. Figures with
+# output_type='file' are shared through their files instead.
+DJANGO_MATPLOTLIB_SHARED_CACHE = {
+    'alias':         None,
+    'timeout':       None,
+    'key_prefix':    'django_matplotlib'
 }
 
 
+# Quotas of figure files (output_type='file') in DJANGO_MATPLOTLIB_TMP
+# directory of the default storage, enforced by `sweep_figures`
+# management command and, if `interval` isn't None, by a background
+# thread every `interval` seconds. Files which weren't used for more than
+# `max_age` seconds are removed, and then least recently used files are
+# removed while their total size exceeds `max_bytes` or their number
+# exceeds `max_files` (None means no limit). Files used within `grace`
+# seconds are kept.
+DJANGO_MATPLOTLIB_SWEEPER = {
+    'max_age':       None,
+    'max_bytes':     None,
+    'max_files':     None,
+    'grace':         60,
+    'interval':      None
+}
+
+
+# Default size (in pixels) and resolution of figure thumbnails shown
+# in admin changelists (see django_matplotlib.admin.FigureThumbnail).
+DJANGO_MATPLOTLIB_THUMBNAILS = {
+    'width':         120,
+    'height':        80,
+    'dpi':           40
+}
+
 
+# Cache-Control directives of responses of django_matplotlib.views.figure_view
+# (keyword arguments of django.utils.cache.patch_cache_control).
+DJANGO_MATPLOTLIB_CACHE_CONTROL = {
+    'private':       True,
+    'max_age':       3600
+}
+
+
+# Figures are rendered in the calling thread by default. If this is
+# a dict, figures are rendered in a pool of worker processes instead, e.g.
+#
+# DJANGO_MATPLOTLIB_PROCESS_POOL = {
+#     'workers':      2,     # number of worker processes
+#     'max_renders':  100,   # renders before a worker is replaced
+#     'timeout':      60,    # seconds before a render is killed
+#     'start_method': None,  # multiprocessing start method of workers
+# }
+#
+# Workers are started by 'forkserver' where available and by 'spawn'
+# otherwise (start_method=None); 'fork' is faster to start, but may
+# deadlock workers forked from a multi-threaded server process.
+# Arguments passed to figure views should be picklable in this case.
+DJANGO_MATPLOTLIB_PROCESS_POOL = None
+
+
+# Rendered figures which are still in memory are counted (see
+# django_matplotlib.fields.render_monitor.stats()). If their number
+# exceeds `max_live_figures` (None means no limit), either
+# ResourceWarning is emitted (action='warn') or all pyplot figures
+# are closed and garbage is collected (action='recycle'; worker
+# processes of DJANGO_MATPLOTLIB_PROCESS_POOL are replaced instead).
+DJANGO_MATPLOTLIB_FIGURE_GUARD = {
+    'max_live_figures':  None,
+    'action':            'warn'
+}
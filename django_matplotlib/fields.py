@@ -1,25 +1,42 @@
 import os
 import re
-import importlib
+import gzip
 import inspect
-import string
-import random
-from base64 import b64encode as b64en
+import tempfile
+from io import BytesIO
+from base64 import b64encode as b64en, b64decode as b64de
+import time
 import hashlib
 import atexit
-from io import BytesIO
-from django.db import models
+from django.db import connections, models
 from django_matplotlib.forms import MatplotlibFigure
 from django.core import checks
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist
 from django.conf import settings
+from django.urls import reverse, NoReverseMatch
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, FileSystemStorage
 from django_matplotlib import conf as djmpl_conf
+from django_matplotlib.cache import (FigureModuleCache, RenderCache,
+                                     SharedCache, SingleFlight)
+from django_matplotlib import rendering, stats
+from django_matplotlib.invalidation import (connect_receivers,
+                                            data_generations, get_model_label)
+from django_matplotlib.fingerprint import (CodeFingerprints,
+                                           DependencyModules, file_stamps,
+                                           resolve_dependency)
+from django_matplotlib.signals import figure_accessed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 try:
-    import matplotlib.pyplot as plt
-    import matplotlib
+    from django.core.files.storage import storages
 except ImportError:
-    plt = None
+    # Django < 4.2
+    storages = None
 
 MEDIA_ROOT = getattr(settings, "MEDIA_ROOT", '')
 MEDIA_URL = getattr(settings, "MEDIA_URL", '')
@@ -33,7 +50,33 @@ for name in dir(djmpl_conf):
                 getattr(settings, name, getattr(djmpl_conf, name)))
 
 
-# register with atexit module
+# loaded figure modules, shared by all fields
+figure_modules = FigureModuleCache(frozen=defaults.DJANGO_MATPLOTLIB_FROZEN)
+
+# rendered figures, shared by all fields
+render_cache = RenderCache(**defaults.DJANGO_MATPLOTLIB_RENDER_CACHE)
+
+# rendered figures, shared by processes and hosts (if configured)
+shared_cache = None
+if defaults.DJANGO_MATPLOTLIB_SHARED_CACHE.get('alias'):
+    shared_cache = SharedCache(**defaults.DJANGO_MATPLOTLIB_SHARED_CACHE)
+    data_generations.shared = shared_cache
+
+# renders in progress
+render_flights = SingleFlight()
+
+# fingerprints of figure views' code
+code_fingerprints = CodeFingerprints()
+
+# modules figures depend on (see `depends_on`)
+dependency_modules = DependencyModules()
+
+# renders figures either inline or in a pool of processes
+render_monitor = rendering.RenderMonitor(**defaults.DJANGO_MATPLOTLIB_FIGURE_GUARD)
+render_backend = rendering.get_backend(defaults.DJANGO_MATPLOTLIB_PROCESS_POOL,
+                                       monitor=render_monitor)
+
+
 def cleanup_file(path):
     try:
         os.remove(path)
@@ -41,9 +84,125 @@ def cleanup_file(path):
         pass
 
 
+# files registered for cleanup at exit
+_cleanup_files = set()
+
+
+@atexit.register
+def _cleanup_at_exit():
+    for path in list(_cleanup_files):
+        cleanup_file(path)
+    _cleanup_files.clear()
+
+
+def touch_file(path):
+    """Marks local figure file as used (see
+    :class:`django_matplotlib.sweeper.FigureSweeper`). Returns `False` if
+    the file doesn't exist (e.g. it was swept).
+    """
+
+    try:
+        os.utime(path)
+    except OSError:
+        return False
+    return True
+
+
+def save_file(path, data):
+    """Saves rendered figure to `path` atomically.
+
+    The figure is written to a temporary file in the same directory
+    and then renamed, so concurrent readers never see partially
+    written files.
+    """
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path,
+                 getattr(settings, 'FILE_UPLOAD_PERMISSIONS', None) or 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        cleanup_file(tmp_path)
+        raise
+
+
+def compress_copies(data):
+    """Returns gzip (`'.gz'`) and brotli (`'.br'`, if `brotli` package is
+    installed) compressed copies of the figure as `(suffix, data)` pairs.
+    They are saved next to the figure, so a static file server can send
+    them directly (e.g. `gzip_static` directive of nginx).
+    """
+
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9,
+                       mtime=0) as f:
+        f.write(data)
+    copies = [('.gz', buffer.getvalue())]
+    if brotli is not None:
+        copies.append(('.br', brotli.compress(data)))
+    return copies
+
+
+def get_storage(storage=None):
+    """Returns storage of figure files.
+
+    :param storage: `None` (:data:`default_storage`), alias of a storage
+                    defined in `STORAGES` setting or storage instance.
+    """
+
+    if storage is None:
+        return default_storage
+    if isinstance(storage, str):
+        if storages is None:
+            raise ImproperlyConfigured("Storage aliases require Django 4.2"
+                                       " or later.")
+        return storages[storage]
+    return storage
+
+
+def get_local_path(storage, name):
+    """ Returns local path of the file or '' if storage isn't local """
+
+    if isinstance(storage, FileSystemStorage):
+        return storage.path(name)
+    return ''
+
+
+def save_to_storage(storage, name, data):
+    """Saves figure file `name` to storage and returns its local path.
+
+    Files of local storages (e.g. `FileSystemStorage`) are written
+    atomically by :func:`save_file`.
+    """
+
+    path = get_local_path(storage, name)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save_file(path, data)
+        return path
+    saved_name = storage.save(name, ContentFile(data))
+    if saved_name != name:
+        # the same file was saved concurrently (possibly by another host)
+        storage.delete(saved_name)
+    return path
+
+
+# content types of supported output formats
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+
 class FigureObject:
-    __slots__ = ('type', 'source', 'path', 'error',
-                 'format', '_width', '_height')
+    __slots__ = ('type', 'source', 'path', 'name', 'storage', 'error',
+                 'format', 'digest', 'modified', 'tiles', '_url', '_width',
+                 '_height')
 
     def __init__(self, width=320, height=240,
                  type='string', source='', path=''):
@@ -52,16 +211,56 @@ class FigureObject:
         self.type = type
         self.source = source
         self.path = path
+        # name of the figure file within storage (if output_type='file')
+        self.name = ''
+        self.storage = None
+        # tile_size and max_zoom of tiled figures (if output_type='tiles')
+        self.tiles = None
         self.error = ''
         self.format = ''
+        self.digest = ''
+        self.modified = time.time()
+        self._url = ''
+
+    @property
+    def nbytes(self):
+        """ Approximate size of the figure object in memory """
+
+        return len(self.source) + len(self.path) + len(self.name)
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES.get(self.format, 'application/octet-stream')
+
+    @property
+    def content(self):
+        """ Rendered figure as bytes """
+
+        if self.path:
+            with open(self.path, 'rb') as f:
+                return f.read()
+        if self.name:
+            with self.storage.open(self.name, 'rb') as f:
+                return f.read()
+        if self.format == 'svg':
+            return self.source.encode('utf-8')
+        return b64de(self.source)
 
     @property
     def url(self):
+        if self._url:
+            return self._url
+        if self.name and self.storage is not None:
+            return self.storage.url(self.name)
         if not self.path or not MEDIA_URL:
             return ''
         path = self.path.replace(MEDIA_ROOT, '')
         return os.path.join('/', MEDIA_URL, path)
 
+    @url.setter
+    def url(self, value):
+        self._url = value
+
     @staticmethod
     def _prepare_size(s):
         if isinstance(s, int):
@@ -90,6 +289,42 @@ class FigureObject:
         self._height = value
 
 
+class LazyFigureObject:
+    """Proxy of :class:`FigureObject` which renders the figure when any of
+    its attributes is accessed for the first time (e.g. when a form's
+    widget is rendered).
+
+    Unlike :class:`django.utils.functional.SimpleLazyObject`, it doesn't
+    proxy `__class__`, so type checks (e.g. by forms preparing initial
+    values) don't render the figure.
+    """
+
+    __slots__ = ('_factory', '_figure')
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._figure = None
+
+    def resolve(self):
+        """ Renders the figure (if not rendered yet) and returns it """
+
+        if self._figure is None:
+            self._figure = self._factory()
+        return self._figure
+
+    @property
+    def evaluated(self):
+        return self._figure is not None
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        if self._figure is None:
+            return '<%s: not rendered>' % type(self).__name__
+        return repr(self._figure)
+
+
 class MatplotlibFieldBase(models.Field):
     def contribute_to_class(self, cls, name, **kwargs):
         super().contribute_to_class(cls, name, **kwargs)
@@ -107,22 +342,41 @@ class MatplotlibFieldBase(models.Field):
 class MatplotlibFigureField(MatplotlibFieldBase):
     """Matplotlib figure field for Django.
 
-    Figures are generated in 'png' (default) or 'svg' formats.
+    Figures are generated in 'png' (default), 'svg', 'webp' or 'jpeg' formats.
     They can be inserted to html documents as inline objects 
     (e.g. using `<img src="data:image/png;base64,...">`) or saved to 
     temporary files.
 
-    If files are saved on disk, they are automatically cleaned up when the
-    program exits using :mod:`atexit` module.
+    Files are saved through Django's storage API (`storage` argument,
+    :data:`default_storage` by default) and named by a digest of the
+    figure's code, arguments and output parameters. So, a figure which was
+    already rendered (e.g. by another process, host or before restart) is
+    reused from storage instead of being rendered again. Local files
+    written by the process are automatically cleaned up when it exits
+    using :mod:`atexit` module (unless `cleanup=False`), while files it
+    only reused are kept for other processes; quotas of long-lived files are
+    enforced by :class:`django_matplotlib.sweeper.FigureSweeper`.
 
     `MatplotlibFigureField` is compatible with standard Django Admin app. 
+    Initial values of its form fields are lazy (:class:`LazyFigureObject`),
+    so figures are rendered only when forms' widgets are rendered, not
+    when forms are built or validated.
 
     Figures automatically re-render (at any subsequent request) 
-    when they code is changed. It uses :func:`hashlib.md5` function to
-    check changes in figure's code. If the figure wasn't changed, 
-    it would be stored in memory and underlying figure view function (which returns 
-    :class:`matplotlib.Figure` instance) not be called for each subsequent
-    request.
+    when they code is changed. Changes are detected by fingerprints of
+    code objects of figure's view and functions it calls, and modification
+    times of files it depends on (see `depends_on`). If the figure wasn't
+    changed, it would be stored in memory and underlying figure view
+    function (which returns :class:`matplotlib.Figure` instance) not be
+    called for each subsequent request. Rendered figures are stored in a process-wide cache
+    (:data:`render_cache`) shared by all fields; its memory budget is
+    configured by `DJANGO_MATPLOTLIB_RENDER_CACHE` setting. They can also
+    be shared by processes and hosts through Django's cache framework
+    (see `DJANGO_MATPLOTLIB_SHARED_CACHE` setting).
+
+    Durations of rendering phases and cache hits are collected in
+    :data:`django_matplotlib.stats.registry` and sent with
+    :data:`django_matplotlib.signals.figure_accessed` signal.
     
     .. note::
 
@@ -138,7 +392,10 @@ class MatplotlibFigureField(MatplotlibFieldBase):
         but forces `required` argument to `False` for corresponding form.
 
         :param figure: The name of callable within `figures.py` which should 
-                       return matplotlib.Figure object.
+                       return matplotlib.Figure object. Raster figures of
+                       :class:`django_matplotlib.figures.FigureTemplate`
+                       callables redraw only their data over a cached
+                       static layer.
         :type figure: str
         :param silent: Be silent on exceptions or not (default is `False`). 
         :type figure: bool
@@ -152,17 +409,112 @@ class MatplotlibFigureField(MatplotlibFieldBase):
         :type fig_width: int
         :param fig_height: Output figure height in pixels. Default is 240.
         :type fig_height: int
-        :param output_type: Output type of the figure. Either 'file' or
-                            'string'. Default is 'string' (used for inline
-                            figure object embedding to html pages).
+        :param fig_dpi: Resolution of the figure (dots per inch). If
+                        `fig_width` and `fig_height` are given in pixels,
+                        figure is rendered exactly at this size, i.e.
+                        its size in inches is set to `fig_width / fig_dpi`
+                        by `fig_height / fig_dpi`. Default is 100.
+        :type fig_dpi: int
+        :param tight_bbox: Crop the figure to its content
+                           (`bbox_inches='tight'`). It requires an extra
+                           drawing pass, and the figure size differs from
+                           the requested one, so `width` and `height` of
+                           cropped figures are left to the browser.
+                           Default is `False`.
+        :type tight_bbox: bool
+        :param output_type: Output type of the figure. One of 'file',
+                            'string', 'url' or 'tiles'. Default is 'string'
+                            (used for inline figure object embedding to
+                            html pages). If 'url', the figure is served by
+                            :func:`django_matplotlib.views.figure_view`
+                            and referenced by `<img src="...">`, so it
+                            can be cached by browsers. If 'tiles', the
+                            figure is shown by a zoomable viewer which
+                            loads tiles of the figure rendered on demand
+                            by :func:`django_matplotlib.views.figure_tile_view`.
         :type output_type: str
-        :param output_format: Output format of the figure. Either 'svg' or
-                              'png' (default).
+        :param tile_size: Size of tiles in pixels if `output_type='tiles'`.
+                          Default is 256.
+        :type tile_size: int
+        :param max_zoom: Maximum zoom level if `output_type='tiles'`. Zoom
+                         level `z` is made of `2**z` by `2**z` tiles.
+                         Default is 4.
+        :type max_zoom: int
+        :param output_format: Output format of the figure. One of 'svg',
+                              'png' (default), 'webp' or 'jpeg' ('webp'
+                              and 'jpeg' require Pillow).
         :type output_format: str
+        :param output_options: Options of output formats, which allow to
+                               trade fidelity for size: `quality` (1-100,
+                               'webp' and 'jpeg'), `lossless` ('webp'),
+                               `compress_level` (0-9, 'png'), `optimize`
+                               ('png' and 'jpeg') and `colors` (number of
+                               palette colors to quantize 'png' and 'webp'
+                               figures to) require Pillow; `precision`
+                               (number of decimal digits of coordinates)
+                               and `minify` (strip metadata, comments and
+                               whitespace) are options of 'svg' figures
+                               (see :func:`django_matplotlib.rendering.minify_svg`).
+        :type output_options: dict
+        :param precompress: If `True` and `output_type='file'`, gzip
+                            (`.svg.gz`) and brotli (`.svg.br`, requires
+                            `brotli` package) compressed copies of 'svg'
+                            figures are saved next to them. Default is
+                            `False`.
+        :type precompress: bool
+        :param decimate: Downsample lines and scatter plots of the figure to
+                         its output resolution before it is drawn, which
+                         bounds rendering time of large series: `'minmax'`
+                         (or `True`) keeps minimum and maximum of each
+                         pixel column, `'lttb'` uses Largest-Triangle-
+                         Three-Buckets algorithm (see
+                         :func:`django_matplotlib.figures.decimate`).
+                         Default is `False`.
+        :type decimate: bool or str
         :param cleanup: Defines whether created files be cleaned up at program
-                        exit or not. Default is True (created files will be
-                        erased at exit). Has sense only if `output_type='file'`.
+                        exit or not. Default is True (files written by the
+                        process will be erased at exit, files reused from
+                        storage are kept). Has sense only if
+                        `output_type='file'`.
         :type cleanup: bool
+        :param threadsafe: If `True`, figure's view shouldn't use
+                           :mod:`matplotlib.pyplot` (see
+                           :func:`django_matplotlib.figures.subplots`),
+                           and the figure is rendered without holding
+                           the global pyplot lock, so concurrent renders
+                           in threads don't block each other.
+                           Default is `False`.
+        :type threadsafe: bool
+        :param pass_instance: If `True`, the model instance the field is
+                              accessed through is passed to the figure's
+                              view as the first positional argument
+                              (`None` when accessed on the model class,
+                              e.g. in unbound forms). Default is `False`.
+        :type pass_instance: bool
+        :param instance_fields: Names of the instance attributes which are
+                                passed to the figure's view as keyword
+                                arguments (`None` values are passed when
+                                accessed on the model class).
+        :type instance_fields: tuple
+        :param depends_on: Files the figure depends on besides its code,
+                           e.g. helper modules (module objects or dotted
+                           names) or data files (paths relative to the
+                           directory of the figures module). The figure is
+                           re-rendered when any of them is modified;
+                           modified modules are reloaded first.
+        :type depends_on: tuple
+        :param storage: Storage of figure files if `output_type='file'`:
+                        alias of a storage defined in `STORAGES` setting,
+                        storage instance or a callable which returns it.
+                        Default is :data:`default_storage`.
+        :type storage: str
+        :param invalidate_on: Models the figure's data comes from (model
+                              classes, querysets or 'app_label.ModelName'
+                              strings). Cached renders of the figure are
+                              invalidated whenever instances of these
+                              models are saved or deleted, or their
+                              many-to-many relations are changed.
+        :type invalidate_on: tuple
 
 
         .. note::
@@ -173,9 +525,10 @@ class MatplotlibFigureField(MatplotlibFieldBase):
 
         .. note:: 
 
-            If `output_type='file'`,  MEDIA_ROOT should be defined in your
-            project settings file. In this case, the field will 
-            save temporary files to the folder `MEDIA_ROOT/DJANGO_MATPLOTLIB_TMP`.
+            If `output_type='file'` and `storage` isn't given, MEDIA_ROOT
+            should be defined in your project settings file. In this case,
+            the field will save temporary files to the folder
+            `MEDIA_ROOT/DJANGO_MATPLOTLIB_TMP`.
             Default value of `DJANGO_MATPLOTLIB_TMP` is defined in `conf.py` and
             can be overridden in your project settings file.
 
@@ -188,113 +541,323 @@ class MatplotlibFigureField(MatplotlibFieldBase):
         self.plt_kwargs = kwargs.pop('plt_kwargs', dict())
         self.fig_width = kwargs.pop('fig_width', defs.get('fig_width'))
         self.fig_height = kwargs.pop('fig_height', defs.get('fig_height'))
+        self.fig_dpi = kwargs.pop('fig_dpi', defs.get('fig_dpi'))
+        self.tight_bbox = kwargs.pop('tight_bbox', defs.get('tight_bbox'))
         self.output_type = kwargs.pop('output_type', defs.get('output_type'))
+        self.tile_size = kwargs.pop('tile_size', defs.get('tile_size'))
+        self.max_zoom = kwargs.pop('max_zoom', defs.get('max_zoom'))
         self.output_format = kwargs.pop('output_format',
                                         defs.get('output_format'))
+        self.output_options = dict(kwargs.pop('output_options',
+                                              defs.get('output_options')) or {})
+        self.precompress = kwargs.pop('precompress', defs.get('precompress'))
+        self.decimate = kwargs.pop('decimate', defs.get('decimate'))
+        if self.decimate is True:
+            self.decimate = 'minmax'
         self.fig_cleanup = kwargs.pop('cleanup', defs.get('cleanup'))
+        self.threadsafe = kwargs.pop('threadsafe', defs.get('threadsafe'))
+        self.pass_instance = kwargs.pop('pass_instance', False)
+        self.instance_fields = tuple(kwargs.pop('instance_fields', tuple()))
+        self.depends_on = tuple(kwargs.pop('depends_on', tuple()))
+        self.storage = kwargs.pop('storage', defs.get('storage'))
+        if callable(self.storage):
+            self.storage = self.storage()
+        self._dependencies = None
+        self.invalidate_on = tuple(map(get_model_label,
+                                       kwargs.pop('invalidate_on', tuple())))
+        if self.invalidate_on:
+            data_generations.track(self.invalidate_on)
+            connect_receivers()
         self._figure_module = None
-        kwargs['null'] = True
+        # figures are computed, there is nothing to validate
+        kwargs['null'] = kwargs['blank'] = True
         super().__init__(*args,  **kwargs)
 
+    def _register_cleanup(self, path):
+        # only files written by this process are cleaned up; files of
+        # remote storages are shared, so they aren't cleaned up
+        if self.fig_cleanup and path:
+            _cleanup_files.add(path)
+
+    def get_storage(self):
+        """ Returns storage of the figure's files """
+
+        return get_storage(self.storage)
+
+    def _save_compressed_copies(self, storage, name, data=None):
+        """ Saves compressed copies of svg figures if they are missing """
+
+        if not self.precompress or self.output_format != 'svg':
+            return
+        if data is None and storage.exists(name + '.gz'):
+            # copies of another process aren't cleaned up by this one
+            return
+        if data is None:
+            with storage.open(name, 'rb') as f:
+                data = f.read()
+        for suffix, compressed in compress_copies(data):
+            self._register_cleanup(
+                save_to_storage(storage, name + suffix, compressed))
+
+    def _get_dependencies(self, base_dir):
+        """Returns `(path, module_name)` of files the figure depends on;
+        relative paths are resolved against `base_dir` (directory of the
+        figures module).
+        """
+
+        if self._dependencies is None:
+            self._dependencies = [resolve_dependency(dependency, base_dir)
+                                  for dependency in self.depends_on]
+        return self._dependencies
+
     def _get_figure_hash(self, func):
-        new_hash = None
-        source = inspect.getsource(func)
+        """Returns fingerprint of the figure's inputs: name, module and code
+        of the figure's view (and functions it calls), its arguments and
+        modification times of files it depends on (see `depends_on`).
+        """
+
+        # views of the same code may differ by their module's state
+        # (e.g. figures.py files of different apps)
+        module_file = getattr(func, '__globals__', {}).get('__file__') or\
+            getattr(self._figure_module, '__file__', '')
+        source = '%s|%s|%s' % (self.figure, module_file,
+                               code_fingerprints.get(func))
         if self.plt_args:
             source += ''.join(map(str, self.plt_args))
         if self.plt_kwargs:
             source += ''.join([str(k) + str(v) for k, v in self.plt_kwargs.items()])  # noqa
-        if source:
-            new_hash = hashlib.md5(source.encode('utf-8')).hexdigest()
-        return new_hash
+        if self.depends_on:
+            paths = [path for path, name in self._get_dependencies(
+                os.path.dirname(module_file))]
+            source += repr(file_stamps(paths))
+        return hashlib.md5(source.encode('utf-8')).hexdigest()
 
-    @property
-    def suggest_filename(self):
-        tmp_dir = os.path.join(MEDIA_ROOT, defaults.DJANGO_MATPLOTLIB_TMP)
-        os.makedirs(tmp_dir, exist_ok=True)
-        suggest_fname = ''.join([random.choice(string.ascii_lowercase) for _ in range(10)])  # noqa
-        suggest_fname += '.' + self.output_format
-        file_path = os.path.join(tmp_dir, suggest_fname)
-        while os.path.exists(file_path):
-            suggest_fname = ''.join([random.choice(string.ascii_lowercase) for _ in range(10)])  # noqa
-            suggest_fname += '.' + self.output_format
-            file_path = os.path.join(tmp_dir, suggest_fname)
-        return file_path
-
-    def _is_figure_changed(self, func):
-        new_hash = self._get_figure_hash(func)
-        if not hasattr(self, '_fig_hash'):
-            return True
-        if new_hash != self._fig_hash:
-            return True
-        else:
-            return False
-
-    def _get_figure(self, func):
-        if plt:
-            matplotlib.use('Agg')
-           
-        if self._is_figure_changed(func):
-            fig_object, func = self._reload_func_source(func)
-            if callable(func):
-                fig_object = FigureObject()
+    def _get_instance_key(self, instance):
+        """ Returns the part of the render key which depends on the instance """
+
+        if instance is None or not (self.pass_instance or self.instance_fields):
+            return None
+        if self.instance_fields:
+            values = []
+            for name in self.instance_fields:
                 try:
-                    fig = func(*self.plt_args, **self.plt_kwargs)
-                except Exception as e:             # noqa
-                    fig_object.error = e
-                    if self.silent:
-                        return fig_object
-                    else:
-                        raise e
-                else:
-                    if not isinstance(fig, plt.Figure):
-                        fig_object.error = "%s should return instance of class"\
-                                        " Matplotlib.Figure" % self.figure
-                        if self.silent:
-                            return fig_object
-                        else:
-                            raise TypeError(fig_object.error)
-                # build fig_object from matplotlib figure
-                fig_object.width = self.fig_width
-                fig_object.height = self.fig_height
-                fig_object.type = self.output_type
-                fig_object.format = self.output_format
-                if self.output_type == 'file':
-                    if not MEDIA_ROOT and self.silent:
-                        fig_object.error = "MEDIA_ROOT isn't configured. "
-                        "Check your project settings file."
-                        return fig_object
-                    elif not MEDIA_ROOT:
-                        raise ImproperlyConfigured("You need to set up MEDIA_ROOT"
-                            " variable in your project sttings file.")
-                    fig_object.path = self.suggest_filename
-                    fig_object.source = ''
-                    fig.savefig(fig_object.path, format=self.output_format,
-                                bbox_inches='tight')
-                    if self.fig_cleanup:
-                        atexit.register(cleanup_file, fig_object.path)
-                elif self.output_type == 'string':
-                    buffer = BytesIO()
-                    fig.savefig(buffer, format=self.output_format,
-                                bbox_inches='tight')
-                    buffer.seek(0)
-                    fig_object.path = ''
-                    if self.output_format == 'png':
-                        fig_object.source = b64en(buffer.read()).decode('utf-8')
-                    else:
-                        fig_object.source =buffer.read().decode('utf-8')
-                    plt.close(fig)
-                else:
-                    fig_object.error = "Undefined figure type. "
-                    "Check out field's 'output_type' argument."
-                if fig_object.path or fig_object.source:
-                    self._fig_hash = self._get_figure_hash(func)
-                self._figure_object = fig_object
-        
-            else:
-                self._figure_object = fig_object
-                self._fig_hash = ''
+                    field = instance._meta.get_field(name)
+                    values.append(field.value_from_object(instance))
+                except FieldDoesNotExist:
+                    values.append(getattr(instance, name, None))
+        else:
+            values = [field.value_from_object(instance)
+                      for field in instance._meta.concrete_fields]
+        return (instance.pk, tuple(values))
+
+    def _get_call_arguments(self, instance):
+        args, kwargs = tuple(self.plt_args), dict(self.plt_kwargs)
+        if self.pass_instance:
+            args = (instance, ) + args
+        for name in self.instance_fields:
+            kwargs[name] = getattr(instance, name, None) if instance else None
+        return args, kwargs
+
+    @staticmethod
+    def _get_pixels(size):
+        size = FigureObject._prepare_size(size)
+        if size and size[:-2].isdigit():
+            return int(size[:-2])
+        return None
+
+    def _get_module_location(self):
+        """ Returns `(path, name)` of the loaded figures module """
+
+        return (self._figure_module.__file__, self._figure_module.__name__)
+
+    def _get_render_options(self):
+        """ Returns keyword arguments of the render backend """
+
+        options = {'format': self.output_format,
+                   'encoding': self.output_options,
+                   'threadsafe': self.threadsafe,
+                   'decimate': self.decimate or None,
+                   'dpi': self.fig_dpi,
+                   'bbox_inches': 'tight' if self.tight_bbox else None}
+        width, height = map(self._get_pixels, (self.fig_width, self.fig_height))
+        if width and height:
+            options['size'] = (width, height)
+        return options
+
+    def _get_render_digest(self, fig_hash, instance=None):
+        """ Returns digest of everything the rendered output depends on """
+
+        options = sorted(self._get_render_options().items())
+        generations = [data_generations.get(label)
+                       for label in self.invalidate_on]
+        storage = self.storage
+        if self.output_type != 'file':
+            storage = None
+        elif hasattr(storage, 'deconstruct'):
+            # the same figure saved to different storages
+            storage = storage.deconstruct()
+        elif storage is not None and not isinstance(storage, str):
+            storage = type(storage).__qualname__
+        identity = None
+        if self.output_type in ('url', 'tiles'):
+            # urls of the figure (and tiles' parameters) depend on the field
+            identity = (self.model._meta.label, self.name)
+            if self.output_type == 'tiles':
+                identity += (self.tile_size, self.max_zoom)
+        source = '|'.join(map(repr, (fig_hash, self._get_instance_key(instance),
+                                     self.output_type, self.fig_width,
+                                     self.fig_height, options, generations,
+                                     storage, identity)))
+        return hashlib.md5(source.encode('utf-8')).hexdigest()
+
+    def suggest_filename(self, digest):
+        """ Returns name of the figure file within storage """
+
+        return '%s/%s.%s' % (defaults.DJANGO_MATPLOTLIB_TMP.strip('/'),
+                             digest, self.output_format)
+
+    def _get_url_kwargs(self, instance=None):
+        kwargs = {'app_label': self.model._meta.app_label,
+                  'model_name': self.model._meta.model_name,
+                  'field_name': self.name}
+        if self._get_instance_key(instance) is not None and\
+                instance.pk is not None:
+            # unsaved instances can't be fetched by the view
+            kwargs['pk'] = instance.pk
+        return kwargs
+
+    def _get_figure_url(self, digest, instance=None):
+        if self.output_type == 'tiles':
+            # url template of tiles, e.g. '.../tiles/{z}/{x}/{y}/?v=...'
+            kwargs = self._get_url_kwargs(instance)
+            kwargs.update({'zoom': 0, 'x': 0, 'y': 0})
+            url = reverse('django_matplotlib:figure_tile', kwargs=kwargs)
+            return '%s{z}/{x}/{y}/?v=%s' % (url[:-len('0/0/0/')], digest[:12])
+        return '%s?v=%s' % (reverse('django_matplotlib:figure',
+                                    kwargs=self._get_url_kwargs(instance)),
+                            digest[:12])
+
+    def _get_cached_figure(self, digest):
+        fig_object = render_cache.get(digest)
+        if fig_object is None and shared_cache is not None:
+            # rendered by another process; figure files aren't shared, but
+            # entries of other types (e.g. thumbnails of file fields) are
+            fig_object = shared_cache.get(digest)
+            if fig_object is not None and fig_object.type == 'file':
+                fig_object = None
+            if fig_object is not None:
+                render_cache.set(digest, fig_object, fig_object.nbytes)
+        if fig_object is None:
+            return None
+        if fig_object.type == 'file' and fig_object.path and\
+                not touch_file(fig_object.path):
+            return None
+        return fig_object
+
+    def _report(self, instance, fig_object, hit, timings):
+        stats.registry.record(stats.get_figure_label(self), hit, timings)
+        figure_accessed.send(sender=self.model, field=self, instance=instance,
+                             figure=fig_object, hit=hit, timings=timings)
+
+    def _get_figure(self, func, instance=None, timings=None, start=None):
+        timings = timings if timings is not None else dict()
+        hash_start = time.perf_counter()
+        fig_hash = self._get_figure_hash(func)
+        digest = self._get_render_digest(fig_hash, instance)
+        timings['hash'] = time.perf_counter() - hash_start
+        fig_object = self._get_cached_figure(digest)
+        hit = fig_object is not None
+        if not hit:
+            # concurrent requests of the same figure wait for a single render
+            fig_object = render_flights.do(
+                digest,
+                lambda: self._render_figure(func, digest, instance, timings))
+        timings['total'] = time.perf_counter() - (start or hash_start)
+        self._report(instance, fig_object, hit, timings)
+        return fig_object
+
+    def _render_figure(self, func, digest, instance=None, timings=None):
+        if self.tight_bbox and self.output_type != 'tiles':
+            # cropped figures aren't of the requested size
+            fig_object = FigureObject(width=None, height=None,
+                                      type=self.output_type)
+        else:
+            fig_object = FigureObject(width=self.fig_width,
+                                      height=self.fig_height,
+                                      type=self.output_type)
+        fig_object.format = self.output_format
+        fig_object.digest = digest
+        if self.output_type in ('url', 'tiles'):
+            try:
+                fig_object.url = self._get_figure_url(digest, instance)
+            except NoReverseMatch:
+                fig_object.error = "Couldn't reverse figure's url. "\
+                "Include 'django_matplotlib.urls' into your URLconf."
+                if self.silent:
+                    return fig_object
+                raise ImproperlyConfigured(fig_object.error)
+        if self.output_type == 'tiles':
+            # tiles are rendered on demand (see get_tile)
+            fig_object.tiles = {'tile_size': self.tile_size,
+                                'max_zoom': self.max_zoom}
+            fig_object.width = fig_object.height = self.tile_size
+            render_cache.set(digest, fig_object, fig_object.nbytes)
+            return fig_object
+        if self.output_type == 'file':
+            if self.storage is None and not MEDIA_ROOT and self.silent:
+                fig_object.error = "MEDIA_ROOT isn't configured. "\
+                "Check your project settings file."
                 return fig_object
-        return self._figure_object
+            elif self.storage is None and not MEDIA_ROOT:
+                raise ImproperlyConfigured("You need to set up MEDIA_ROOT"
+                    " variable in your project sttings file.")
+            storage = fig_object.storage = self.get_storage()
+            fig_object.name = self.suggest_filename(digest)
+            fig_object.path = get_local_path(storage, fig_object.name)
+            if storage.exists(fig_object.name):
+                # the same figure was already rendered (possibly by
+                # another process or host, whose pages may refer to it,
+                # so it isn't cleaned up by this process)
+                touch_file(fig_object.path)
+                self._save_compressed_copies(storage, fig_object.name)
+                render_cache.set(digest, fig_object, fig_object.nbytes)
+                return fig_object
+        args, kwargs = self._get_call_arguments(instance)
+        try:
+            data = render_backend.render(func, self.figure, args, kwargs,
+                                         timings=timings,
+                                         module=self._get_module_location(),
+                                         **self._get_render_options())
+        except Exception as e:             # noqa
+            fig_object.error = e
+            if self.silent:
+                return fig_object
+            else:
+                raise e
+        # build fig_object from rendered figure
+        start = time.perf_counter()
+        if self.output_type == 'file':
+            fig_object.source = ''
+            save_to_storage(fig_object.storage, fig_object.name, data)
+            self._register_cleanup(fig_object.path)
+            self._save_compressed_copies(fig_object.storage, fig_object.name,
+                                         data)
+        elif self.output_type in ('string', 'url'):
+            fig_object.path = ''
+            if self.output_format == 'svg':
+                fig_object.source = data.decode('utf-8')
+            else:
+                fig_object.source = b64en(data).decode('utf-8')
+        else:
+            fig_object.error = "Undefined figure type. "\
+            "Check out field's 'output_type' argument."
+        if timings is not None:
+            timings['encode'] = time.perf_counter() - start
+        if fig_object.name or fig_object.source:
+            render_cache.set(digest, fig_object, fig_object.nbytes)
+            if shared_cache is not None and self.output_type != 'file':
+                shared_cache.set(digest, fig_object)
+        return fig_object
 
     def _reload_func_source(self, owner):
         """ Returns reloaded function """
@@ -303,13 +866,14 @@ class MatplotlibFigureField(MatplotlibFieldBase):
         func = None
         try:
             current_dir = os.path.dirname(inspect.getsourcefile(owner))
-            spec = importlib.util.spec_from_file_location(
-                defaults.DJANGO_MATPLOTLIB_MODULE.split('.')[0],
-                os.path.join(current_dir,
-                                defaults.DJANGO_MATPLOTLIB_MODULE)
-                )
-            self._figure_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(self._figure_module)
+            path = os.path.join(current_dir, defaults.DJANGO_MATPLOTLIB_MODULE)
+            if self.depends_on and dependency_modules.reload_changed(
+                    [dependency for dependency in
+                     self._get_dependencies(current_dir) if dependency[1]]):
+                # the figures module may refer to old code of the modules
+                figure_modules.discard(path)
+            self._figure_module = figure_modules.load(
+                path, defaults.DJANGO_MATPLOTLIB_MODULE.split('.')[0])
         except ImportError:
             fig_object.error = "Couldn't locate '%s' in the"\
             " app directory." % defaults.DJANGO_MATPLOTLIB_MODULE
@@ -329,16 +893,199 @@ class MatplotlibFigureField(MatplotlibFieldBase):
                 raise AttributeError(fig_object.error)
         return fig_object, getattr(self._figure_module, self.figure)
 
-    def __get__(self, attr, owner=None):
+    def _render_tile(self, func, digest, instance, tile, timings=None):
+        fig_object = FigureObject(width=self.tile_size, height=self.tile_size)
+        fig_object.digest = digest
+        args, kwargs = self._get_call_arguments(instance)
+        options = self._get_render_options()
+        options.update({'size': (self.tile_size, self.tile_size),
+                        'bbox_inches': None, 'tile': tile})
+        if self.output_format == 'svg':
+            # tiles are raster images
+            options.update({'format': 'png', 'encoding': {}})
+        fig_object.format = options['format']
+        data = render_backend.render(func, self.figure, args, kwargs,
+                                     timings=timings,
+                                     module=self._get_module_location(),
+                                     **options)
+        start = time.perf_counter()
+        fig_object.source = b64en(data).decode('utf-8')
+        if timings is not None:
+            timings['encode'] = time.perf_counter() - start
+        render_cache.set(digest, fig_object, fig_object.nbytes)
+        if shared_cache is not None:
+            shared_cache.set(digest, fig_object)
+        return fig_object
+
+    def get_tile(self, instance, zoom, x, y):
+        """Returns tile `(x, y)` of zoom level `zoom` of the figure with
+        `output_type='tiles'` (as :class:`FigureObject` with
+        `type='string'`). Tiles are rendered on demand and cached.
+
+        :raises ValueError: if the tile doesn't exist.
+        """
+
+        if not 0 <= zoom <= self.max_zoom or\
+                not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+            raise ValueError("Tile (%s, %s) of zoom level %s doesn't exist."
+                             % (x, y, zoom))
+        start = time.perf_counter()
+        owner = self.model if instance is None else type(instance)
+        fig_obj, func = self._reload_func_source(owner)
+        if not callable(func):
+            return fig_obj
+        hash_start = time.perf_counter()
+        timings = {'load': hash_start - start}
+        fig_digest = self._get_render_digest(self._get_figure_hash(func),
+                                             instance)
+        tile = (zoom, x, y)
+        digest = hashlib.md5(repr((fig_digest, self.tile_size, tile))
+                             .encode('utf-8')).hexdigest()
+        timings['hash'] = time.perf_counter() - hash_start
+        fig_object = self._get_cached_figure(digest)
+        hit = fig_object is not None
+        if not hit:
+            fig_object = render_flights.do(
+                digest,
+                lambda: self._render_tile(func, digest, instance, tile,
+                                          timings))
+        timings['total'] = time.perf_counter() - start
+        self._report(instance, fig_object, hit, timings)
+        return fig_object
+
+    def _get_thumbnail_digest(self, fig_hash, instance, size, dpi):
+        # thumbnails are cached apart from full-size renders
+        return 'thumbnail:' + hashlib.md5(repr((
+            self._get_render_digest(fig_hash, instance), size, dpi))
+            .encode('utf-8')).hexdigest()
+
+    def get_thumbnails(self, instances, width=None, height=None, dpi=None):
+        """Returns thumbnails of the figure for each of `instances` (as
+        :class:`FigureObject` with `type='string'`), e.g. for rows of an
+        admin changelist.
+
+        Thumbnails which aren't cached are rendered in a single batch
+        in the calling thread (see
+        :func:`django_matplotlib.rendering.render_thumbnails`); if figure's
+        view accepts `ax` argument, one figure is reused for the whole
+        batch. Default size and resolution of thumbnails are defined by
+        `DJANGO_MATPLOTLIB_THUMBNAILS` setting.
+        """
+
+        options = defaults.DJANGO_MATPLOTLIB_THUMBNAILS
+        size = (width or options['width'], height or options['height'])
+        dpi = dpi or options['dpi']
+        instances = list(instances)
+        start = time.perf_counter()
+        owner = self.model if not instances or instances[0] is None\
+            else type(instances[0])
+        fig_obj, func = self._reload_func_source(owner)
+        if not callable(func):
+            return [fig_obj] * len(instances)
+        hash_start = time.perf_counter()
+        timings = {'load': hash_start - start}
+        fig_hash = self._get_figure_hash(func)
+        digests = [self._get_thumbnail_digest(fig_hash, instance, size, dpi)
+                   for instance in instances]
+        timings['hash'] = time.perf_counter() - hash_start
+        thumbnails = dict()
+        missing = dict()
+        for digest, instance in zip(digests, instances):
+            fig_object = self._get_cached_figure(digest)
+            if fig_object is not None:
+                thumbnails[digest] = fig_object
+            else:
+                missing.setdefault(digest, instance)
+        if missing:
+            format, encoding = self.output_format, self.output_options
+            if format == 'svg':
+                # thumbnails are raster images
+                format, encoding = 'png', {}
+            call_start = time.perf_counter()
+            results = rendering.render_thumbnails(
+                func, self.figure,
+                [self._get_call_arguments(instance)
+                 for instance in missing.values()],
+                format=format, size=size, dpi=dpi, threadsafe=self.threadsafe,
+                monitor=render_monitor, encoding=encoding)
+            render_monitor.check()
+            # each thumbnail is charged its share of the batch
+            call_time = (time.perf_counter() - call_start) / len(missing)
+            for digest, result in zip(missing, results):
+                fig_object = FigureObject(width=size[0], height=size[1])
+                fig_object.format = format
+                fig_object.digest = digest
+                if isinstance(result, Exception):
+                    if not self.silent:
+                        raise result
+                    fig_object.error = result
+                else:
+                    fig_object.source = b64en(result).decode('utf-8')
+                    render_cache.set(digest, fig_object, fig_object.nbytes)
+                    if shared_cache is not None:
+                        shared_cache.set(digest, fig_object)
+                thumbnails[digest] = fig_object
+        for digest, instance in zip(digests, instances):
+            thumbnail_timings = dict(timings)
+            # repeated thumbnails are rendered once
+            hit = digest not in missing
+            missing.pop(digest, None)
+            if not hit:
+                thumbnail_timings['call'] = call_time
+            thumbnail_timings['total'] = sum(thumbnail_timings.values())
+            self._report(instance, thumbnails[digest], hit, thumbnail_timings)
+        return [thumbnails[digest] for digest in digests]
+
+    def __get__(self, instance, owner=None):
         if owner:
+            if not isinstance(instance, models.Model):
+                instance = None
+            start = time.perf_counter()
             fig_obj, func = self._reload_func_source(owner)
+            timings = {'load': time.perf_counter() - start}
             if callable(func):
-                self._figure_object = self._get_figure(func)
-                return self._figure_object
+                return self._get_figure(func, instance=instance,
+                                        timings=timings, start=start)
             else:
-                self._figure_object = fig_obj
                 return fig_obj
 
+    async def aget(self, instance=None):
+        """Returns figure object without blocking the event loop.
+
+        The figure is rendered in a thread of asgiref's executor (see
+        :func:`asgiref.sync.sync_to_async`), e.g.::
+
+            field = MyModel._meta.get_field('figure')
+            fig_object = await field.aget(instance)
+
+        Concurrent requests of the same figure share a single render.
+        Database connections opened by figure's view are closed once
+        the figure is rendered.
+        """
+
+        from asgiref.sync import sync_to_async
+
+        owner = self.model if instance is None else type(instance)
+        return await sync_to_async(self._get_and_close_connections,
+                                   thread_sensitive=False)(instance, owner)
+
+    def _get_and_close_connections(self, instance, owner):
+        # connections of executor's threads aren't closed by Django
+        try:
+            return self.__get__(instance, owner)
+        finally:
+            connections.close_all()
+
+    def __set__(self, instance, value):
+        # Figures are computed, so values assigned to the field
+        # (e.g. defaults set by Model.__init__) are ignored.
+        pass
+
+    def get_attname(self):
+        # Model.__init__ and Model.clean_fields access fields by their
+        # attnames, so validation doesn't render figures
+        return '_%s_value' % self.name
+
     def check(self, **kwargs):
         return [
             *super().check(**kwargs),
@@ -348,21 +1095,45 @@ class MatplotlibFigureField(MatplotlibFieldBase):
         ]
 
     def _check_fig_format(self, **kwargs):
-        if self.output_format not in ['svg', 'png']:
+        if self.output_format not in CONTENT_TYPES:
             return [
                 checks.Error(
-                    "Attribute 'fig_format' should be either 'png' or 'svg'.",
+                    "Attribute 'fig_format' should be one of 'png', 'svg', "
+                    "'webp' or 'jpeg'.",
                     obj=self,
                     id='django_matplotlib.E003',
                 )
             ]
+        if rendering.Image is None and self.output_format != 'svg' and\
+                (self.output_options or self.output_format in ('webp', 'jpeg')):
+            return [
+                checks.Error(
+                    "Pillow is required for 'webp' and 'jpeg' formats "
+                    "and 'output_options'.",
+                    obj=self,
+                    id='django_matplotlib.E005',
+                )
+            ]
+        supported = rendering.get_encoding_options(self.output_format)
+        unknown = sorted(set(self.output_options) - set(supported))
+        if unknown:
+            return [
+                checks.Error(
+                    "Unknown 'output_options' of '%s' format: %s." % (
+                        self.output_format, ', '.join(unknown)),
+                    hint="Supported options are: %s." % ', '.join(supported),
+                    obj=self,
+                    id='django_matplotlib.E006',
+                )
+            ]
         return []
 
     def _check_fig_type(self, **kwargs):
-        if self.output_type not in ['string', 'file']:
+        if self.output_type not in ['string', 'file', 'url', 'tiles']:
             return [
                 checks.Error(
-                    "Attribute 'fig_type' should be either 'string' or 'file'.",
+                    "Attribute 'fig_type' should be one of 'string', 'file', "
+                    "'url' or 'tiles'.",
                     obj=self,
                     id='django_matplotlib.E004',
                 )
@@ -390,10 +1161,15 @@ class MatplotlibFigureField(MatplotlibFieldBase):
         else:
             return []
 
+    def value_from_object(self, obj):
+        # used by model forms for initial values, so the figure is
+        # rendered only if the form is rendered
+        return LazyFigureObject(lambda: self.__get__(obj, owner=type(obj)))
+
     def formfield(self, **kwargs):
-        self.__get__('', owner=self.model)
         defaults = {'form_class': MatplotlibFigure,
                     'choices_form_class': MatplotlibFigure,
-                    'initial': self._figure_object}
+                    'initial': LazyFigureObject(
+                        lambda: self.__get__(None, owner=self.model))}
         defaults.update(kwargs)
         return super().formfield(**defaults)
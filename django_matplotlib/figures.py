@@ -1,4 +1,317 @@
+import threading
+import numpy as np
+import matplotlib
+import matplotlib.colors
 import matplotlib.pyplot as plt
+from matplotlib.collections import PathCollection
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def figure(**kwargs):
+    """Creates matplotlib.Figure without using pyplot.
+
+    Unlike `plt.figure`, the figure isn't registered in pyplot's
+    global figure manager, so it is safe to create and render
+    it in concurrent threads (see `threadsafe` field's option).
+    Keyword arguments are passed to `matplotlib.figure.Figure`.
+    """
+
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def subplots(nrows=1, ncols=1, **kwargs):
+    """Thread-safe counterpart of `plt.subplots`.
+
+    Returns a tuple `(fig, ax)`, where `ax` is a single axes
+    object or an array of axes objects (as `plt.subplots` does).
+    """
+
+    subplot_kw = {name: kwargs.pop(name) for name in
+                  ('sharex', 'sharey', 'squeeze', 'subplot_kw',
+                   'gridspec_kw') if name in kwargs}
+    fig = figure(**kwargs)
+    return fig, fig.subplots(nrows, ncols, **subplot_kw)
+
+
+def _decimate_minmax(x, y, n_out):
+    # points are bucketed by x into n_out / 2 equal intervals (e.g. pixel
+    # columns); points with minimum and maximum y of each bucket are kept
+    n_buckets = max(n_out // 2, 1)
+    span = x[-1] - x[0]
+    if span > 0:
+        buckets = ((x - x[0]) * (n_buckets / span)).astype(np.int64)
+        np.minimum(buckets, n_buckets - 1, out=buckets)
+    else:
+        buckets = np.zeros(len(x), dtype=np.int64)
+    # x is sorted, so buckets are contiguous runs of points
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(x)])
+    segments = np.repeat(np.arange(len(starts)), counts)
+    keep = [0, len(x) - 1]
+    # fmin and fmax ignore NaNs (unless all values of a bucket are NaN)
+    for reduce in (np.fmin, np.fmax):
+        extremes = np.repeat(reduce.reduceat(y, starts), counts)
+        candidates = np.flatnonzero(y == extremes)
+        # the first extreme point of each bucket
+        keep.append(candidates[np.unique(segments[candidates],
+                                         return_index=True)[1]])
+    gaps = np.isnan(y)
+    if gaps.any():
+        # NaNs break the line: points at both ends of each gap are kept
+        edges = np.flatnonzero(gaps[1:] != gaps[:-1])
+        keep.extend((edges, edges + 1))
+    keep = np.unique(np.concatenate([np.atleast_1d(k) for k in keep]))
+    return x[keep], y[keep]
+
+
+def _decimate_lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: the first and the last points are
+    # kept, and the point forming the largest triangle with the previously
+    # selected point and the average of the next bucket is selected from
+    # each of n_out - 2 buckets of equal size
+    n_out = max(n_out, 3)
+    edges = np.linspace(1, len(x) - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, len(x) - 1
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            next_end = edges[i + 2]
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        areas = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected]) -
+                       (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = keep[i + 1] = start + np.argmax(areas)
+    return x[keep], y[keep]
+
+
+_DECIMATION_METHODS = {
+    'minmax': _decimate_minmax,
+    'lttb': _decimate_lttb,
+}
+
+
+def decimate(x, y, n_out, method='minmax'):
+    """Downsamples line `(x, y)` to about `n_out` points.
+
+    Method 'minmax' keeps the first and the last points and the points with
+    minimum and maximum `y` within each of `n_out / 2` equal intervals of
+    `x` (e.g. pixel columns), so the drawn line looks the same if `n_out`
+    is twice its width in pixels. Method 'lttb' (Largest-Triangle-Three-
+    Buckets) keeps exactly `n_out` points which preserve the shape of the
+    line. `x` should be sorted in ascending order; series which have less
+    than `n_out` points are returned unchanged. Gaps of the line (NaNs of
+    `y`) are kept by 'minmax'; 'lttb' returns lines with gaps unchanged.
+
+    Returns a tuple `(x, y)` of arrays.
+    """
+
+    x, y = np.asarray(x), np.asarray(y)
+    if method not in _DECIMATION_METHODS:
+        raise ValueError("Unknown decimation method '%s'." % method)
+    if len(x) <= n_out or method == 'lttb' and np.isnan(y).any():
+        return x, y
+    return _DECIMATION_METHODS[method](x, y, n_out)
+
+
+def _decimate_scatter(collection, ax):
+    # keeps one marker per pixel (the one drawn last, i.e. visible)
+    offsets = np.asarray(collection.get_offsets())
+    pixels = np.round(ax.transData.transform(offsets)).astype(np.int64)
+    keep = len(pixels) - 1 - np.unique(pixels[::-1], axis=0,
+                                       return_index=True)[1]
+    keep.sort()
+    if len(keep) == len(offsets):
+        return
+    for getter, setter in (('get_sizes', 'set_sizes'),
+                           ('get_facecolors', 'set_facecolors'),
+                           ('get_edgecolors', 'set_edgecolors'),
+                           ('get_array', 'set_array')):
+        values = getattr(collection, getter)()
+        if values is not None and len(values) == len(offsets):
+            getattr(collection, setter)(np.asarray(values)[keep])
+    collection.set_offsets(offsets[keep])
+
+
+def decimate_figure(fig, method='minmax', dpi=None):
+    """Downsamples lines and scatter plots of the figure to the resolution
+    it is drawn at (see :func:`decimate`). Lines with unsorted (or NaN) `x`
+    are left unchanged. Markers of scatter plots which fall into the same pixel are
+    drawn once.
+
+    :param dpi: Resolution of the output (`fig.dpi` by default).
+    """
+
+    dpi = dpi or fig.dpi
+    for ax in fig.axes:
+        width = ax.get_position().width * fig.get_figwidth() * dpi
+        view = abs(ax.get_xlim()[1] - ax.get_xlim()[0])
+        for line in ax.get_lines():
+            x, y = line.get_xdata(orig=False), line.get_ydata(orig=False)
+            x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+            if len(x) < 2 or not np.all(np.diff(x) >= 0):
+                continue
+            # the line may extend beyond the view
+            scale = max((x[-1] - x[0]) / view, 1) if view else 1
+            n_out = int(width * scale) * (2 if method == 'minmax' else 1)
+            if len(x) > 2 * n_out:
+                line.set_data(*decimate(x, y, n_out, method))
+        for collection in ax.collections:
+            if isinstance(collection, PathCollection) and\
+                    len(collection.get_offsets()) > width:
+                _decimate_scatter(collection, ax)
+
+
+class FigureTemplate:
+    """Figure view whose static layer (axes, gridlines, labels, legends
+    of reference lines and so on) is drawn once and reused by renders
+    which differ only in data, e.g.::
+
+        def layout(fig):
+            ax = fig.add_subplot(1, 1, 1)
+            ax.set_xlim(0, 24)
+            ax.set_ylim(-30, 40)
+            ax.grid(True)
+            ax.set_xlabel('hour')
+
+        def temperatures(fig, values):
+            fig.axes[0].plot(range(len(values)), values)
+
+        temperature_plot = FigureTemplate(layout, temperatures)
+
+    `setup(fig)` builds the static layer of figure `fig`, and
+    `draw(fig, *args, **kwargs)` adds data artists to it. Limits of axes
+    are fixed once the static layer is built (autoscaling is disabled),
+    and `draw` should only add artists, not change existing ones.
+
+    Calling the template returns a new figure with both layers, so it is
+    a regular figure view (see `figure` argument of fields). Raster renders
+    (see :meth:`render`) instead draw data artists over a cached pixel
+    buffer of the static layer (blitting), and remove them afterwards.
+    The color cycle of axes restarts for each render, so `draw` should
+    set colors explicitly if `setup` changes the property cycle.
+
+    Keyword arguments are passed to :func:`figure`.
+    """
+
+    def __init__(self, setup, draw, **kwargs):
+        self.setup = setup
+        self.draw = draw
+        self.figure_kwargs = kwargs
+        # static layers drawn for each (size, dpi, tight)
+        self._layers = dict()
+        self._lock = threading.Lock()
+
+    def _build(self):
+        fig = figure(**self.figure_kwargs)
+        self.setup(fig)
+        for ax in fig.axes:
+            ax.set_xlim(ax.get_xlim())
+            ax.set_ylim(ax.get_ylim())
+        return fig
+
+    def __call__(self, *args, **kwargs):
+        fig = self._build()
+        self.draw(fig, *args, **kwargs)
+        return fig
+
+    def _get_layer(self, size, dpi, tight):
+        key = (size, dpi, tight)
+        if key in self._layers:
+            return self._layers[key]
+        fig = self._build()
+        dpi = dpi or fig.dpi
+        fig.set_dpi(dpi)
+        if size:
+            fig.set_size_inches(size[0] / dpi, size[1] / dpi)
+        fig.canvas.draw()
+        background = fig.canvas.copy_from_bbox(fig.bbox)
+        box = None
+        if tight:
+            # the static layer defines the content's bounding box
+            bbox = fig.get_tightbbox(fig.canvas.get_renderer())
+            width, height = fig.get_size_inches()
+            if bbox.x0 < 0 or bbox.y0 < 0 or\
+                    bbox.x1 > width or bbox.y1 > height:
+                # the content extends beyond the canvas
+                box = False
+            else:
+                bbox = bbox.padded(matplotlib.rcParams['savefig.pad_inches'])
+                # sizes are truncated as by the renderer of `savefig`,
+                # which is anchored at the bottom left corner
+                bottom = int(round((height - bbox.y0) * dpi))
+                left = int(round(bbox.x0 * dpi))
+                box = (bottom - int(bbox.height * dpi), bottom,
+                       left, left + int(bbox.width * dpi))
+        layer = self._layers[key] = (fig, background, box)
+        return layer
+
+    @staticmethod
+    def _crop(fig, pixels, box):
+        # the padding may extend beyond the canvas, where it is filled
+        # with the figure's face color (as `savefig` does)
+        top, bottom, left, right = box
+        color = np.round(np.array(matplotlib.colors.to_rgba(
+            fig.get_facecolor())) * 255)
+        cropped = np.empty((bottom - top, right - left, 4), dtype=pixels.dtype)
+        cropped[:] = color.astype(pixels.dtype)
+        height, width = pixels.shape[:2]
+        region = pixels[max(top, 0):min(bottom, height),
+                        max(left, 0):min(right, width)]
+        cropped[max(-top, 0):max(-top, 0) + region.shape[0],
+                max(-left, 0):max(-left, 0) + region.shape[1]] = region
+        return cropped
+
+    @staticmethod
+    def _get_new_artists(containers, children):
+        return [(container, [artist for artist in container.get_children()
+                             if artist not in known])
+                for container, known in zip(containers, children)]
+
+    def render(self, args=(), kwargs=None, size=None, dpi=None, tight=False):
+        """Draws data artists (`draw(fig, *args, **kwargs)`) over the cached
+        static layer and returns the image as an RGBA array.
+
+        Returns `None` if `tight` is `True` and the static layer doesn't fit
+        the figure (e.g. its labels are cut), since pixels beyond the figure
+        aren't drawn; such figures should be drawn as a whole (see
+        :meth:`__call__`).
+
+        :param size: Size of the image `(width, height)` in pixels.
+        :param dpi: Resolution of the image.
+        :param tight: Crop the image to the content of the static layer
+                      (as `bbox_inches='tight'` does).
+        """
+
+        with self._lock:
+            fig, background, box = self._get_layer(size, dpi, tight)
+            if box is False:
+                return None
+            containers = [fig] + fig.axes
+            children = [set(container.get_children())
+                        for container in containers]
+            for ax in fig.axes:
+                ax.set_prop_cycle(None)
+            fig.canvas.restore_region(background)
+            try:
+                self.draw(fig, *args, **(kwargs or {}))
+                for container, artists in self._get_new_artists(containers,
+                                                                children):
+                    for artist in sorted(artists, key=lambda a: a.get_zorder()):
+                        container.draw_artist(artist)
+                pixels = np.array(fig.canvas.buffer_rgba())
+            finally:
+                for container, artists in self._get_new_artists(containers,
+                                                                children):
+                    for artist in artists:
+                        artist.remove()
+        return self._crop(fig, pixels, box) if box else pixels
+
 
 def test_figure():
     fig = plt.figure()
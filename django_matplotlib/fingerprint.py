@@ -0,0 +1,185 @@
+import os
+import sys
+import types
+import hashlib
+import functools
+import threading
+import importlib
+import importlib.util
+from weakref import WeakKeyDictionary
+
+
+# values of globals which are included into fingerprints by their repr
+_PLAIN_TYPES = (type(None), bool, int, float, complex, str, bytes,
+                tuple, list, dict, set, frozenset)
+
+
+def _get_function(obj):
+    """ Returns plain function which implements callable `obj` """
+
+    if isinstance(obj, types.MethodType):
+        return obj.__func__
+    if isinstance(obj, types.FunctionType):
+        return obj
+    call = getattr(type(obj), '__call__', None)
+    return call if isinstance(call, types.FunctionType) else None
+
+
+class CodeFingerprints:
+    """Fingerprints of callables based on their code objects.
+
+    A fingerprint covers the callable's bytecode, constants, names and
+    defaults, recursively including nested code objects and functions
+    it refers through its globals (e.g. helper functions), as well as
+    plain values of referenced globals (e.g. `COLORS = [...]`).
+
+    Fingerprints are computed once per function object: figure modules
+    are re-executed when their files change, which creates new function
+    objects.
+    """
+
+    def __init__(self):
+        self._memo = WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _update(self, md5, code, func_globals, seen):
+        md5.update(code.co_code)
+        md5.update(repr(code.co_names).encode('utf-8'))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                self._update(md5, const, func_globals, seen)
+            else:
+                md5.update(repr(const).encode('utf-8'))
+        for name in code.co_names:
+            if name not in func_globals:
+                continue
+            value = func_globals[name]
+            func = value if isinstance(value, types.FunctionType) else None
+            if func is not None:
+                if func not in seen:
+                    seen.add(func)
+                    self._update_function(md5, func, seen)
+            elif isinstance(value, _PLAIN_TYPES):
+                md5.update(('%s=%r' % (name, value)).encode('utf-8'))
+
+    def _update_function(self, md5, func, seen):
+        md5.update(func.__qualname__.encode('utf-8'))
+        md5.update(repr((func.__defaults__,
+                         func.__kwdefaults__)).encode('utf-8'))
+        self._update(md5, func.__code__, func.__globals__, seen)
+
+    def _get_function_fingerprint(self, func):
+        with self._lock:
+            fingerprint = self._memo.get(func)
+        if fingerprint is None:
+            md5 = hashlib.md5()
+            self._update_function(md5, func, {func})
+            fingerprint = md5.hexdigest()
+            with self._lock:
+                self._memo[func] = fingerprint
+        return fingerprint
+
+    def get(self, obj):
+        """Returns fingerprint (hex digest) of callable `obj`.
+
+        Fingerprints of partial functions include their arguments, and
+        fingerprints of callable objects (e.g.
+        :class:`django_matplotlib.figures.FigureTemplate`) include functions
+        and plain values stored in their public attributes.
+
+        :raises TypeError: if `obj` isn't implemented by Python code
+                           (e.g. a builtin function).
+        """
+
+        if isinstance(obj, functools.partial):
+            md5 = hashlib.md5(self.get(obj.func).encode('utf-8'))
+            md5.update(repr((obj.args, sorted(obj.keywords.items())))
+                       .encode('utf-8'))
+            return md5.hexdigest()
+        func = _get_function(obj)
+        if func is None:
+            raise TypeError("Can't fingerprint %r: it isn't a Python function,"
+                            " method, partial or callable object." % (obj, ))
+        fingerprint = self._get_function_fingerprint(func)
+        if isinstance(obj, (types.FunctionType, types.MethodType)):
+            return fingerprint
+        md5 = hashlib.md5(fingerprint.encode('utf-8'))
+        for name, value in sorted(getattr(obj, '__dict__', {}).items()):
+            if name.startswith('_'):
+                continue
+            if isinstance(value, (types.FunctionType, types.MethodType,
+                                  functools.partial)):
+                value = self.get(value)
+            elif not isinstance(value, _PLAIN_TYPES):
+                continue
+            md5.update(('%s=%r' % (name, value)).encode('utf-8'))
+        return md5.hexdigest()
+
+
+def resolve_dependency(dependency, base_dir):
+    """Returns `(path, module_name)` of the file figure depends on;
+    `module_name` is `None` if it isn't a module (e.g. a data file).
+
+    :param dependency: Module object, dotted name of a module or path
+                       of a file (relative paths are resolved against
+                       `base_dir`).
+    """
+
+    if isinstance(dependency, types.ModuleType):
+        return os.path.abspath(dependency.__file__), dependency.__name__
+    path = os.path.join(base_dir, dependency)
+    if os.path.exists(path):
+        return os.path.abspath(path), None
+    try:
+        spec = importlib.util.find_spec(dependency)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is not None and spec.origin and os.path.exists(spec.origin):
+        return os.path.abspath(spec.origin), dependency
+    # a data file which doesn't exist (yet)
+    return os.path.abspath(path), None
+
+
+class DependencyModules:
+    """Reloads modules figures depend on (see `depends_on` argument of
+    :class:`django_matplotlib.fields.MatplotlibFigureField`) when their
+    files change, so re-rendered figures use their new code.
+
+    Files of modules are stamped when they are checked for the first
+    time, i.e. modules are assumed to be up to date at that moment.
+    """
+
+    def __init__(self):
+        self._stamps = dict()
+        self._lock = threading.Lock()
+
+    def reload_changed(self, modules):
+        """Reloads modified modules of `(path, module_name)` pairs.
+        Returns `True` if any of them was modified.
+        """
+
+        changed = False
+        with self._lock:
+            for path, name in modules:
+                stamp = file_stamps([path])[0]
+                if self._stamps.setdefault(name, stamp) == stamp:
+                    continue
+                self._stamps[name] = stamp
+                changed = True
+                if name in sys.modules:
+                    importlib.reload(sys.modules[name])
+        return changed
+
+
+def file_stamps(paths):
+    """ Returns (mtime, size) of files; missing files are stamped as `None` """
+
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stamps.append(None)
+        else:
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+    return stamps
@@ -9,6 +9,10 @@ class MatplotlibWidget(Widget):
   
     def get_context(self, name, value, attrs):
         context = super().get_context(name, value, attrs)
+        # lazy figures are rendered here, not by the template,
+        # which would silence rendering errors
+        if hasattr(value, 'resolve'):
+            value = value.resolve()
         context['figure'] = value
         return context
 
@@ -19,3 +23,11 @@ class MatplotlibFigure(Field):
     def __init__(self, **kwargs):
         kwargs.update({'required': False})
         super().__init__(**kwargs)
+
+    def bound_data(self, data, initial):
+        # figures aren't submitted, bound forms show the initial figure
+        return initial
+
+    def has_changed(self, initial, data):
+        # don't render the (lazy) initial figure to compare it
+        return False
@@ -0,0 +1,99 @@
+import uuid
+import threading
+from django.db.models import Model, QuerySet
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+
+class DataGenerations:
+    """Thread-safe counters of data changes, keyed by model label.
+
+    Fields which depend on models (see `invalidate_on` argument of
+    :class:`django_matplotlib.fields.MatplotlibFigureField`) include
+    generations of these models into digests of their renders, so
+    bumping a generation invalidates only affected cached figures.
+
+    If `shared` (:class:`django_matplotlib.cache.SharedCache`) is set,
+    generations are kept there, so changes made by one process
+    invalidate figures cached by all of them. Otherwise, generations
+    are local to the process and include its random `nonce`: changes
+    made by other processes aren't seen, so renders (e.g. figure files)
+    of other processes and of previous runs are never reused.
+    """
+
+    def __init__(self, shared=None):
+        self.shared = shared
+        self.nonce = uuid.uuid4().hex
+        self._counters = dict()
+        self._tracked = set()
+        self._lock = threading.Lock()
+
+    def track(self, labels):
+        with self._lock:
+            self._tracked.update(labels)
+
+    def is_tracked(self, label):
+        return label in self._tracked
+
+    def get(self, label):
+        if self.shared is not None:
+            return self.shared.get_counter('generation:' + label)
+        return '%s:%s' % (self.nonce, self._counters.get(label, 0))
+
+    def bump(self, label):
+        if self.shared is not None:
+            self.shared.incr('generation:' + label)
+            return
+        with self._lock:
+            self._counters[label] = self._counters.get(label, 0) + 1
+
+
+# generations of tracked models' data, shared by all fields
+data_generations = DataGenerations()
+
+
+def get_model_label(dependency):
+    """Returns lowercased label ('app_label.modelname') of the model.
+
+    :param dependency: Model class, queryset or 'app_label.ModelName'.
+    """
+
+    if isinstance(dependency, str):
+        return dependency.lower()
+    if isinstance(dependency, QuerySet):
+        dependency = dependency.model
+    if isinstance(dependency, type) and issubclass(dependency, Model):
+        return dependency._meta.label_lower
+    raise TypeError("Expected model class, queryset or 'app_label.ModelName',"
+                    " got %r." % (dependency, ))
+
+
+def _bump_model(model):
+    for cls in [model] + list(model._meta.get_parent_list()):
+        label = cls._meta.label_lower
+        if data_generations.is_tracked(label):
+            data_generations.bump(label)
+
+
+def data_changed(sender, **kwargs):
+    """ Receiver of post_save and post_delete signals """
+
+    _bump_model(sender)
+
+
+def m2m_data_changed(sender, action, instance, model, **kwargs):
+    """ Receiver of m2m_changed signal """
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _bump_model(sender)
+        _bump_model(type(instance))
+        _bump_model(model)
+
+
+def connect_receivers():
+    """ Connects receivers of model signals (once) """
+
+    post_save.connect(data_changed, dispatch_uid='django_matplotlib.post_save')
+    post_delete.connect(data_changed,
+                        dispatch_uid='django_matplotlib.post_delete')
+    m2m_changed.connect(m2m_data_changed,
+                        dispatch_uid='django_matplotlib.m2m_changed')
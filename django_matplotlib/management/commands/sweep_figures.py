@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django_matplotlib.sweeper import get_sweeper
+
+
+class Command(BaseCommand):
+    help = ("Removes figure files (output_type='file') exceeding quotas "
+            "of DJANGO_MATPLOTLIB_SWEEPER setting, least recently used first.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--storage', default=None,
+            help="Alias of the storage of figure files "
+                 "(default: default_storage).")
+        parser.add_argument(
+            '--max-age', type=float, default=None,
+            help="Remove files which weren't used for this number of seconds.")
+        parser.add_argument(
+            '--max-bytes', type=int, default=None,
+            help="Maximum total size of files.")
+        parser.add_argument(
+            '--max-files', type=int, default=None,
+            help="Maximum number of files.")
+        parser.add_argument(
+            '--grace', type=float, default=None,
+            help="Keep files used within this number of seconds.")
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report files which would be removed, remove nothing.")
+
+    def handle(self, **options):
+        quotas = {name: options[name]
+                  for name in ('max_age', 'max_bytes', 'max_files', 'grace')
+                  if options[name] is not None}
+        sweeper = get_sweeper(options['storage'], **quotas)
+        stats = sweeper.sweep(dry_run=options['dry_run'])
+        if options['verbosity'] > 0:
+            self.stdout.write(self.style.SUCCESS(
+                "%s %s figures (%s bytes), kept %s figures (%s bytes)." % (
+                    'Would remove' if options['dry_run'] else 'Removed',
+                    stats['files'], stats['bytes'],
+                    stats['kept_files'], stats['kept_bytes'])))
@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django_matplotlib import fields
+from django_matplotlib.fields import MatplotlibFigureField
+
+
+class Command(BaseCommand):
+    help = ("Renders figures of all MatplotlibFigureFields to warm up "
+            "figure caches (e.g. rendered files).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'labels', nargs='*', metavar='app_label[.ModelName]',
+            help="Render figures of these apps or models only.")
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help="Number of figures rendered in parallel. Figures which "
+                 "aren't thread-safe are rendered in parallel only if "
+                 "DJANGO_MATPLOTLIB_PROCESS_POOL is configured.")
+        parser.add_argument(
+            '--instances', action='store_true',
+            help="Render figures of all model instances for fields "
+                 "depending on instances.")
+
+    def get_models(self, labels):
+        if not labels:
+            return apps.get_models()
+        models = []
+        for label in labels:
+            try:
+                if '.' in label:
+                    models.append(apps.get_model(label))
+                else:
+                    models.extend(apps.get_app_config(label).get_models())
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+        return models
+
+    def get_skip_reason(self, field):
+        """ Returns why renders of the field wouldn't outlive the command """
+
+        if field.output_type == 'tiles':
+            return "tiles are rendered on demand"
+        if field.output_type != 'file' and fields.shared_cache is None:
+            return ("renders of output_type '%s' are kept in memory of the "
+                    "command's process only (set up "
+                    "DJANGO_MATPLOTLIB_SHARED_CACHE)" % field.output_type)
+        return ''
+
+    def get_tasks(self, labels, instances=False):
+        for model in self.get_models(labels):
+            for field in model._meta.private_fields:
+                if not isinstance(field, MatplotlibFigureField):
+                    continue
+                reason = self.get_skip_reason(field)
+                if reason:
+                    self.stderr.write(self.style.WARNING(
+                        "%s.%s skipped: %s." % (model._meta.label,
+                                                field.name, reason)))
+                    continue
+                if instances and (field.pass_instance or field.instance_fields):
+                    for instance in model._default_manager.iterator():
+                        yield model, field, instance
+                else:
+                    yield model, field, None
+
+    def render(self, task):
+        model, field, instance = task
+        start = time.perf_counter()
+        try:
+            fig_object = field.__get__(instance, model)
+            error = fig_object.error if fig_object is not None else ''
+        except Exception as e:      # noqa
+            error = e
+        return task, time.perf_counter() - start, error
+
+    def handle(self, **options):
+        tasks = self.get_tasks(options['labels'],
+                               instances=options['instances'])
+        failures = 0
+        total = 0
+        # files are rendered for the server processes, so they aren't
+        # cleaned up when the command exits
+        registered = set(fields._cleanup_files)
+        try:
+            with ThreadPoolExecutor(
+                    max_workers=max(options['workers'], 1)) as executor:
+                for (model, field, instance), duration, error in\
+                        executor.map(self.render, tasks):
+                    total += 1
+                    name = '%s.%s' % (model._meta.label, field.name)
+                    if instance is not None:
+                        name += ' [pk=%s]' % instance.pk
+                    if error:
+                        failures += 1
+                        self.stderr.write("%s failed in %.3fs: %s" % (
+                            name, duration, error))
+                    elif options['verbosity'] > 0:
+                        self.stdout.write("%s rendered in %.3fs" % (
+                            name, duration))
+        finally:
+            fields._cleanup_files.intersection_update(registered)
+        if failures:
+            raise CommandError("%s of %s figures failed." % (failures, total))
+        if options['verbosity'] > 0:
+            self.stdout.write(self.style.SUCCESS(
+                "%s figures rendered." % total))
@@ -0,0 +1,78 @@
+import threading
+from debug_toolbar.panels import Panel
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    ContextVar = None
+from django_matplotlib.signals import figure_accessed
+from django_matplotlib.stats import get_figure_label
+
+
+class FiguresPanel(Panel):
+    """Django Debug Toolbar panel listing figures accessed during a request.
+
+    Add `'django_matplotlib.panels.FiguresPanel'` to
+    `DEBUG_TOOLBAR_PANELS` setting to enable it.
+
+    Figures are attributed to the request by the context (see
+    :mod:`contextvars`) the panel was enabled in, which is passed to
+    threads running the views under ASGI. On Python < 3.7 figures are
+    attributed by thread, so figures accessed under ASGI aren't listed.
+    """
+
+    title = 'Figures'
+    template = 'panels/matplotlib.html'
+
+    # panel of the request being processed (if contextvars are available)
+    _current = ContextVar('django_matplotlib_panel', default=None)\
+        if ContextVar is not None else None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._figures = []
+        self._thread = None
+        self._token = None
+
+    @property
+    def nav_subtitle(self):
+        figures = self.get_stats().get('figures', self._figures)
+        return '%s figures in %.1f ms' % (
+            len(figures), sum(f['total'] for f in figures))
+
+    def _record(self, sender, field, instance, figure, hit, timings,
+                **kwargs):
+        # figures accessed by other requests are ignored
+        if self._current is not None:
+            if self._current.get() is not self:
+                return
+        elif threading.get_ident() != self._thread:
+            return
+        self._figures.append({
+            'label': get_figure_label(field),
+            'pk': getattr(instance, 'pk', None),
+            'hit': hit,
+            'error': str(figure.error) if figure is not None else '',
+            'total': timings.get('total', 0) * 1000,
+            'timings': sorted((phase, duration * 1000) for phase, duration
+                              in timings.items() if phase != 'total'),
+        })
+
+    def enable_instrumentation(self):
+        if self._current is not None:
+            self._token = self._current.set(self)
+        self._thread = threading.get_ident()
+        figure_accessed.connect(self._record, dispatch_uid=id(self))
+
+    def disable_instrumentation(self):
+        figure_accessed.disconnect(dispatch_uid=id(self))
+        if self._token is not None:
+            try:
+                self._current.reset(self._token)
+            except ValueError:
+                # disabled in another context than it was enabled in
+                pass
+            self._token = None
+
+    def generate_stats(self, request, response):
+        self.record_stats({'figures': self._figures})
@@ -0,0 +1,660 @@
+import os
+import re
+import gc
+import time
+import atexit
+import inspect
+import weakref
+import warnings
+import threading
+import multiprocessing
+from io import BytesIO
+from django_matplotlib.cache import FigureModuleCache
+
+try:
+    import matplotlib
+    import matplotlib.image
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from django_matplotlib.figures import decimate_figure, FigureTemplate
+except ImportError:
+    plt = None
+    Figure = None
+    FigureTemplate = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# formats which are produced by Pillow from png rendered by matplotlib
+PILLOW_FORMATS = ('webp', 'jpeg')
+
+
+# pyplot keeps global state (e.g. figure manager), so renders using it
+# are serialized
+_pyplot_lock = threading.RLock()
+_agg_enabled = False
+
+
+class RenderError(Exception):
+    """ Rendering process failed unexpectedly """
+
+
+class RenderTimeout(RenderError):
+    """ Rendering took longer than allowed """
+
+
+def _use_agg():
+    global _agg_enabled
+    if plt and not _agg_enabled:
+        matplotlib.use('Agg')
+        _agg_enabled = True
+
+
+def _is_pyplot_figure(fig):
+    return getattr(fig.canvas, 'manager', None) is not None
+
+
+_svg_junk = re.compile(rb'<\?xml[^>]*\?>|<!DOCTYPE[^>]*>|<!--.*?-->|'
+                       rb'<metadata>.*?</metadata>', re.S)
+# transforms aren't rounded, since they scale glyphs and markers
+_svg_attribute = re.compile(rb'(\s(?!transform=)[\w:-]+=")([^"]*)(")')
+_svg_number = re.compile(rb'-?\d*\.\d+(?:[eE][-+]?\d+)?')
+_svg_spaces = re.compile(rb'>\s+<')
+
+
+def _round_numbers(value, precision):
+    def replace(match):
+        number = ('%.*f' % (precision, float(match.group(0)))).rstrip('0')
+        number = number.rstrip('.')
+        return b'0' if number in ('', '-0', '-') else number.encode('ascii')
+    return _svg_number.sub(replace, value)
+
+
+def minify_svg(data, precision=None, minify=True):
+    """Reduces size of svg image `data` produced by matplotlib.
+
+    :param precision: Number of decimal digits of coordinates and other
+                      numbers in attribute values except transforms
+                      (`None` keeps them).
+    :param minify: Strip xml declaration, doctype, comments, metadata and
+                   whitespace between tags.
+    """
+
+    if minify:
+        data = _svg_spaces.sub(b'><', _svg_junk.sub(b'', data)).strip()
+    if precision is not None:
+        data = _svg_attribute.sub(
+            lambda m: m.group(1) + _round_numbers(m.group(2), precision) +
+            m.group(3), data)
+    return data
+
+
+def encode_raster(data, format, quality=None, lossless=False,
+                  compress_level=None, optimize=False, colors=None):
+    """Re-encodes png image `data` to `format` using Pillow.
+
+    :param format: One of 'png', 'webp' or 'jpeg'.
+    :param quality: Quality of lossy formats (1-100).
+    :param lossless: Use lossless compression ('webp').
+    :param compress_level: Compression level of 'png' (0-9).
+    :param optimize: Make an extra pass to select optimal encoder settings
+                     ('png' and 'jpeg').
+    :param colors: Quantize the image to a palette of this number of
+                   colors ('png' and 'webp').
+    """
+
+    image = Image.open(BytesIO(data))
+    options = dict()
+    if format == 'jpeg':
+        # jpeg doesn't support transparency
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.convert('RGBA').split()[-1])
+        image = background
+    elif colors:
+        method = Image.FASTOCTREE if image.mode == 'RGBA' else None
+        image = image.quantize(colors, method=method)
+    if quality is not None:
+        options['quality'] = quality
+    if format == 'webp':
+        options['lossless'] = lossless
+    if compress_level is not None:
+        options['compress_level'] = compress_level
+    if optimize:
+        options['optimize'] = True
+    buffer = BytesIO()
+    image.save(buffer, format=format.upper(), **options)
+    return buffer.getvalue()
+
+
+def get_encoding_options(format):
+    """ Returns names of encoding options (`output_options`) of `format` """
+
+    encoder = minify_svg if format == 'svg' else encode_raster
+    return [name for name in inspect.signature(encoder).parameters
+            if name not in ('data', 'format')]
+
+
+def _close_pyplot_figures(fignums):
+    with _pyplot_lock:
+        for num in fignums:
+            plt.close(num)
+
+
+def apply_tile(fig, zoom, x, y):
+    """Shows tile `(x, y)` (counted from the top left corner) of zoom level
+    `zoom` of the figure, i.e. 1/2**zoom part of each axes' view limits.
+    Axes fill the whole figure and their decorations are hidden, so tiles
+    of a zoom level can be joined into a single image.
+    """
+
+    n = 2 ** zoom
+    for ax in fig.axes:
+        (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+        ax.set_xlim(x0 + (x1 - x0) * x / n, x0 + (x1 - x0) * (x + 1) / n)
+        ax.set_ylim(y1 - (y1 - y0) * (y + 1) / n, y1 - (y1 - y0) * y / n)
+        # e.g. imshow's aspect='equal' would shrink axes within the tile
+        ax.set_aspect('auto')
+        ax.set_position([0, 0, 1, 1])
+        ax.set_axis_off()
+
+
+def _can_blit(func, format, tile, decimate, savefig_kwargs):
+    """ Returns `True` if the figure is rendered by blitting a template """
+
+    return FigureTemplate is not None and isinstance(func, FigureTemplate) and\
+        format != 'svg' and not tile and not decimate and\
+        set(savefig_kwargs) <= {'dpi', 'bbox_inches'} and\
+        savefig_kwargs.get('bbox_inches') in (None, 'tight')
+
+
+def _blit_template(template, args, kwargs, size, timings, savefig_kwargs):
+    start = time.perf_counter()
+    pixels = template.render(args, kwargs, size=size,
+                             dpi=savefig_kwargs.get('dpi'),
+                             tight=savefig_kwargs.get('bbox_inches') == 'tight')
+    timings['call'] = time.perf_counter() - start
+    if pixels is None:
+        return None
+    start = time.perf_counter()
+    buffer = BytesIO()
+    matplotlib.image.imsave(buffer, pixels, format='png',
+                            dpi=savefig_kwargs.get('dpi'))
+    timings['save'] = time.perf_counter() - start
+    return buffer.getvalue()
+
+
+def _draw_figure(func, name, args, kwargs, format, size, threadsafe, monitor,
+                 timings, tile, decimate, savefig_kwargs):
+    # pyplot figures created by the view (unless it is thread-safe,
+    # since other threads may create pyplot figures concurrently)
+    fignums = set() if threadsafe or not plt else set(plt.get_fignums())
+    fig = None
+    try:
+        start = time.perf_counter()
+        fig = func(*args, **kwargs)
+        timings['call'] = time.perf_counter() - start
+        if Figure is None or not isinstance(fig, Figure):
+            raise TypeError("%s should return instance of class"
+                            " Matplotlib.Figure" % name)
+        if monitor is not None:
+            monitor.track(fig)
+        if not _is_pyplot_figure(fig) and\
+                not isinstance(fig.canvas, FigureCanvasAgg):
+            FigureCanvasAgg(fig)
+        if tile:
+            apply_tile(fig, *tile)
+        if size:
+            dpi = savefig_kwargs['dpi'] = savefig_kwargs.get('dpi') or fig.dpi
+            fig.set_size_inches(size[0] / dpi, size[1] / dpi)
+        if decimate:
+            decimate_figure(fig, decimate, savefig_kwargs.get('dpi'))
+        start = time.perf_counter()
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png' if format in PILLOW_FORMATS else format,
+                    **savefig_kwargs)
+        timings['save'] = time.perf_counter() - start
+    finally:
+        if not threadsafe and plt:
+            _close_pyplot_figures(set(plt.get_fignums()) - fignums)
+        elif isinstance(fig, Figure) and _is_pyplot_figure(fig):
+            _close_pyplot_figures([fig])
+    return buffer.getvalue()
+
+
+def _render(func, name, args, kwargs, format, size, threadsafe, monitor,
+            timings, encoding, tile, decimate, savefig_kwargs):
+    data = None
+    if _can_blit(func, format, tile, decimate, savefig_kwargs):
+        # only data artists are drawn
+        data = _blit_template(func, args, kwargs, size, timings,
+                              savefig_kwargs)
+    if data is None:
+        data = _draw_figure(func, name, args, kwargs, format, size,
+                            threadsafe, monitor, timings, tile, decimate,
+                            savefig_kwargs)
+    if format == 'svg' and encoding:
+        start = time.perf_counter()
+        data = minify_svg(data, **encoding)
+        timings['compress'] = time.perf_counter() - start
+    elif encoding or format in PILLOW_FORMATS:
+        start = time.perf_counter()
+        data = encode_raster(data, format, **(encoding or {}))
+        timings['compress'] = time.perf_counter() - start
+    if monitor is not None:
+        monitor.record(len(data))
+    return data
+
+
+def render_figure(func, name, args, kwargs, format='png', threadsafe=False,
+                  size=None, monitor=None, timings=None, encoding=None,
+                  tile=None, decimate=None, **savefig_kwargs):
+    """Calls figure's view and returns the figure rendered to bytes.
+
+    If `threadsafe` is `False`, the render holds a process-wide lock,
+    since figure's view may use :mod:`matplotlib.pyplot`. Otherwise, the
+    figure's view should create figures without pyplot (e.g. using
+    :func:`django_matplotlib.figures.subplots`); such figures are drawn
+    by :class:`FigureCanvasAgg` concurrently with other renders.
+
+    Pyplot figures created by the view are closed when the render
+    completes, even if it fails.
+
+    Raster figures of :class:`django_matplotlib.figures.FigureTemplate`
+    views are rendered by blitting their data artists over the cached
+    static layer (unless they are tiled or decimated).
+
+    :param func: Callable which returns matplotlib.Figure object.
+    :param name: Name of the callable (used in error messages).
+    :param args: Positional arguments passed to the callable.
+    :param kwargs: Keyword arguments passed to the callable.
+    :param format: Output format of the figure.
+    :param threadsafe: Don't serialize renders.
+    :param size: Output size of the figure `(width, height)` in pixels.
+    :param monitor: :class:`RenderMonitor` which counts rendered figures.
+    :param timings: Dictionary to store durations (in seconds) of calling
+                    the view (`'call'`), saving the figure (`'save'`) and
+                    re-encoding or minifying it (`'compress'`).
+    :param encoding: Keyword arguments of :func:`minify_svg` (if `format`
+                     is 'svg') or :func:`encode_raster`. Raster figures
+                     are re-encoded by Pillow if they are given or `format`
+                     is 'webp' or 'jpeg'.
+    :param tile: Render only tile `(zoom, x, y)` of the figure (see
+                 :func:`apply_tile`).
+    :param decimate: Downsample lines and scatter plots to the output
+                     resolution using this method ('minmax' or 'lttb', see
+                     :func:`django_matplotlib.figures.decimate_figure`).
+    :param savefig_kwargs: Keyword arguments passed to `Figure.savefig`.
+    """
+
+    timings = timings if timings is not None else dict()
+    if threadsafe:
+        return _render(func, name, args, kwargs, format, size, threadsafe,
+                       monitor, timings, encoding, tile, decimate,
+                       savefig_kwargs)
+    with _pyplot_lock:
+        _use_agg()
+        return _render(func, name, args, kwargs, format, size, threadsafe,
+                       monitor, timings, encoding, tile, decimate,
+                       savefig_kwargs)
+
+
+def accepts_axes(func):
+    """ Returns `True` if figure's view draws into given axes (`ax` argument) """
+
+    try:
+        return 'ax' in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def clear_data_artists(ax):
+    """Removes data artists (lines, collections, patches, images, texts and
+    the legend) drawn on the axes, keeping the axes with their ticks, labels
+    and title. The color cycle and autoscaling are reset, so the axes can
+    be redrawn with other data as if they were new.
+    """
+
+    for artists in (ax.lines, ax.collections, ax.patches, ax.images,
+                    ax.texts):
+        for artist in list(artists):
+            artist.remove()
+    if ax.get_legend() is not None:
+        ax.get_legend().remove()
+    ax.set_prop_cycle(None)
+    ax.relim()
+    ax.set_autoscale_on(True)
+
+
+def _render_thumbnails(func, name, calls, format, size, dpi, threadsafe,
+                       monitor, encoding):
+    view = func
+    if accepts_axes(func):
+        # a single figure is redrawn for all calls
+        fig = Figure(figsize=(size[0] / dpi, size[1] / dpi), dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+
+        def view(*args, **kwargs):
+            clear_data_artists(ax)
+            func(*args, ax=ax, **kwargs)
+            return fig
+
+    results = []
+    for args, kwargs in calls:
+        try:
+            results.append(_render(view, name, args, kwargs, format, size,
+                                   threadsafe, monitor, dict(), encoding,
+                                   None, None,
+                                   {'dpi': dpi, 'bbox_inches': None}))
+        except Exception as e:      # noqa
+            results.append(e)
+    return results
+
+
+def render_thumbnails(func, name, calls, format='png', size=(120, 80),
+                      dpi=40, threadsafe=False, monitor=None, encoding=None):
+    """Renders thumbnails of the figure for each `(args, kwargs)` pair of
+    `calls` in the calling thread (holding the pyplot lock once for the
+    whole batch unless `threadsafe`).
+
+    If figure's view accepts `ax` argument, it is passed axes of a single
+    figure, which is reused for all calls: data artists drawn by the
+    previous call are removed (see :func:`clear_data_artists`) instead of
+    building a new figure. Otherwise, the view is called as usual and its
+    figure is drawn at the thumbnail size.
+
+    Returns the list of rendered thumbnails (bytes) or exceptions raised
+    by the calls.
+
+    :param size: Size of thumbnails `(width, height)` in pixels.
+    :param dpi: Resolution of thumbnails.
+    """
+
+    if threadsafe:
+        return _render_thumbnails(func, name, calls, format, size, dpi,
+                                  threadsafe, monitor, encoding)
+    with _pyplot_lock:
+        _use_agg()
+        return _render_thumbnails(func, name, calls, format, size, dpi,
+                                  threadsafe, monitor, encoding)
+
+
+class RenderMonitor:
+    """Counts rendered figures which are still in memory and output sizes.
+
+    If the number of live figures exceeds `max_live_figures` (if not
+    `None`), :meth:`check` either emits :class:`ResourceWarning`
+    (`action='warn'`) or closes all pyplot figures and collects
+    garbage (`action='recycle'`; process pool workers are replaced
+    instead).
+    """
+
+    def __init__(self, max_live_figures=None, action='warn'):
+        self.max_live_figures = max_live_figures
+        self.action = action
+        self._figures = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.bytes = 0
+        self.last_bytes = 0
+        self.max_bytes = 0
+
+    def track(self, fig):
+        with self._lock:
+            self._figures.add(fig)
+
+    def record(self, nbytes):
+        with self._lock:
+            self.renders += 1
+            self.bytes += nbytes
+            self.last_bytes = nbytes
+            self.max_bytes = max(self.max_bytes, nbytes)
+
+    @property
+    def live_figures(self):
+        with self._lock:
+            return len(self._figures)
+
+    def is_exceeded(self):
+        return self.max_live_figures is not None and\
+            self.live_figures > self.max_live_figures
+
+    def check(self, recycle=True):
+        """Applies the guard, returns `True` if the limit was exceeded.
+
+        If `recycle` is `False`, resources aren't released even
+        if `action='recycle'` (the caller is expected to do that).
+        """
+
+        if not self.is_exceeded():
+            return False
+        if self.action == 'recycle':
+            if recycle:
+                gc.collect()
+                if plt:
+                    with _pyplot_lock:
+                        plt.close('all')
+        else:
+            warnings.warn("%s matplotlib figures are still in memory "
+                          "(limit is %s)." % (self.live_figures,
+                                              self.max_live_figures),
+                          ResourceWarning)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {'renders': self.renders,
+                    'bytes': self.bytes,
+                    'last_bytes': self.last_bytes,
+                    'max_bytes': self.max_bytes,
+                    'avg_bytes': self.bytes / self.renders if self.renders else 0,
+                    'live_figures': len(self._figures),
+                    'pyplot_figures': len(plt.get_fignums()) if plt else 0}
+
+
+class InlineBackend:
+    """ Renders figures in the calling thread """
+
+    def __init__(self, monitor=None):
+        self.monitor = monitor if monitor is not None else RenderMonitor()
+
+    def render(self, func, name, args, kwargs, timings=None, module=None,
+               **options):
+        data = render_figure(func, name, args, kwargs, monitor=self.monitor,
+                             timings=timings, **options)
+        self.monitor.check()
+        return data
+
+    def close(self):
+        pass
+
+
+def _setup_worker():
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    _use_agg()
+    from django.apps import apps
+    if not apps.ready and os.environ.get('DJANGO_SETTINGS_MODULE'):
+        import django
+        django.setup()
+
+
+def _worker_main(conn, guard):
+    """ Main loop of rendering process """
+
+    _setup_worker()
+    modules = FigureModuleCache()
+    monitor = RenderMonitor(**guard)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        path, module_name, name, args, kwargs, options = task
+        timings = dict()
+        try:
+            start = time.perf_counter()
+            func = getattr(modules.load(path, module_name), name)
+            timings['worker_load'] = time.perf_counter() - start
+            data = render_figure(func, name, args, kwargs, monitor=monitor,
+                                 timings=timings, **options)
+            result = (True, data)
+        except Exception as e:      # noqa
+            result = (False, e)
+        # the worker is replaced if it has too many figures in memory
+        recycle = monitor.check(recycle=False) and monitor.action == 'recycle'
+        try:
+            conn.send(result + (recycle, timings))
+        except Exception:
+            # exception raised by figure's view couldn't be pickled
+            conn.send((False, RenderError(repr(result[1])), recycle, timings))
+
+
+def _get_default_start_method():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return 'forkserver'
+    return 'spawn'
+
+
+class _Worker:
+    def __init__(self, context, guard):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, guard), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.renders = 0
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.conn.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class ProcessPoolBackend:
+    """Renders figures in a pool of worker processes.
+
+    Figures are rendered by at most `workers` processes, which are
+    started on demand. A worker is replaced by a new one after
+    `max_renders` renders (if not `None`) to release memory leaked by
+    matplotlib. Renders lasting longer than `timeout` seconds
+    (if not `None`) are killed along with their worker, and
+    :class:`RenderTimeout` is raised.
+
+    Figure views (functions or other callables, e.g.
+    :class:`django_matplotlib.figures.FigureTemplate`) are loaded by
+    workers from their modules by name, so arguments passed to them must
+    be picklable.
+
+    Workers apply the guard of `monitor` to figures they render
+    and are replaced if it is exceeded and `monitor.action` is
+    'recycle'; `monitor` counts sizes of rendered figures.
+
+    Workers are started by :mod:`multiprocessing` `start_method`
+    ('forkserver' where available, 'spawn' otherwise by default):
+    forking a multi-threaded server process copies locks held by
+    its other threads, which may deadlock the worker.
+    """
+
+    def __init__(self, workers=2, max_renders=100, timeout=60,
+                 start_method=None, monitor=None):
+        self.monitor = monitor if monitor is not None else RenderMonitor()
+        self.workers = workers
+        self.max_renders = max_renders
+        self.timeout = timeout
+        self._context = multiprocessing.get_context(
+            start_method or _get_default_start_method())
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = []
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        try:
+            if worker is None or not worker.is_alive():
+                worker = _Worker(self._context, {
+                    'max_live_figures': self.monitor.max_live_figures,
+                    'action': self.monitor.action})
+        except Exception:
+            self._slots.release()
+            raise
+        return worker
+
+    def _release(self, worker):
+        if worker is not None:
+            if self.max_renders is not None and\
+                    worker.renders >= self.max_renders:
+                worker.stop()
+            else:
+                with self._lock:
+                    self._idle.append(worker)
+        self._slots.release()
+
+    def render(self, func, name, args, kwargs, timings=None, module=None,
+               **options):
+        """Renders figure's view `name` of `module` (`(path, module_name)`
+        of the figures module; the module of `func` by default) in a worker.
+        """
+
+        if module is None:
+            module = (func.__globals__['__file__'], func.__module__)
+        task = module + (name, tuple(args), dict(kwargs), options)
+        worker = self._acquire()
+        try:
+            worker.conn.send(task)
+            if not worker.conn.poll(self.timeout):
+                worker.kill()
+                worker = None
+                raise RenderTimeout("Rendering of '%s' took longer than %s"
+                                    " seconds." % (name, self.timeout))
+            success, result, recycle, worker_timings = worker.conn.recv()
+            worker.renders += 1
+            if timings is not None:
+                timings.update(worker_timings)
+            if recycle:
+                worker.stop()
+                worker = None
+        except (EOFError, OSError):
+            worker.kill()
+            worker = None
+            raise RenderError("Rendering process of '%s' died." % name)
+        finally:
+            self._release(worker)
+        if not success:
+            raise result
+        self.monitor.record(len(result))
+        return result
+
+    def close(self):
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.stop()
+
+
+def get_backend(pool_options=None, monitor=None):
+    """ Returns process pool backend if its options are given """
+
+    if pool_options:
+        return ProcessPoolBackend(monitor=monitor, **pool_options)
+    return InlineBackend(monitor=monitor)
@@ -0,0 +1,21 @@
+from django.dispatch import Signal
+
+
+# Sent whenever a figure of MatplotlibFigureField is accessed.
+#
+# Arguments:
+#   sender    model class the field belongs to
+#   field     MatplotlibFigureField instance
+#   instance  model instance (None if the field is accessed on the class)
+#   figure    FigureObject returned by the field
+#   hit       True if the figure was taken from the render cache
+#   timings   durations (in seconds) of rendering phases:
+#             'load'   - loading the figures module,
+#             'hash'   - computing figure's hash and digest,
+#             'call'   - calling figure's view,
+#             'save'   - saving the figure (Figure.savefig),
+#             'compress' - re-encoding the figure by Pillow,
+#             'encode' - encoding or writing the result to a file,
+#             'total'  - total time of accessing the figure.
+#             Only performed phases are present.
+figure_accessed = Signal()
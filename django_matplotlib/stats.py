@@ -0,0 +1,109 @@
+import logging
+import threading
+from django_matplotlib.signals import figure_accessed
+
+
+def get_figure_label(field):
+    """ Returns label of the figure field, e.g. 'app.Model.field' """
+
+    return '%s.%s' % (field.model._meta.label, field.name)
+
+
+class FigureStats:
+    """In-process registry of figures' rendering statistics.
+
+    For each figure field (labeled as 'app_label.ModelName.field_name')
+    it counts cache hits and misses, and aggregates durations of
+    rendering phases (count, total and maximum durations in seconds).
+    """
+
+    def __init__(self):
+        self._figures = dict()
+        self._lock = threading.Lock()
+
+    def record(self, label, hit, timings):
+        with self._lock:
+            stats = self._figures.setdefault(
+                label, {'hits': 0, 'misses': 0, 'phases': dict()})
+            stats['hits' if hit else 'misses'] += 1
+            for phase, duration in timings.items():
+                phase_stats = stats['phases'].setdefault(
+                    phase, {'count': 0, 'total': 0.0, 'max': 0.0})
+                phase_stats['count'] += 1
+                phase_stats['total'] += duration
+                phase_stats['max'] = max(phase_stats['max'], duration)
+
+    def snapshot(self):
+        """ Returns a copy of collected statistics """
+
+        with self._lock:
+            return {label: {'hits': stats['hits'],
+                            'misses': stats['misses'],
+                            'phases': {phase: dict(phase_stats) for
+                                       phase, phase_stats in
+                                       stats['phases'].items()}}
+                    for label, stats in self._figures.items()}
+
+    def reset(self):
+        with self._lock:
+            self._figures.clear()
+
+
+# statistics of all figures of the process
+registry = FigureStats()
+
+
+class SignalAdapter:
+    """Base class of receivers of :data:`figure_accessed` signal.
+
+    Call :meth:`connect` (e.g. in `AppConfig.ready`) to start
+    receiving the signal.
+    """
+
+    def connect(self):
+        figure_accessed.connect(self, dispatch_uid=id(self))
+        return self
+
+    def disconnect(self):
+        figure_accessed.disconnect(dispatch_uid=id(self))
+
+    def __call__(self, sender, field, instance, figure, hit, timings,
+                 **kwargs):
+        self.handle(get_figure_label(field), hit, timings, figure)
+
+    def handle(self, label, hit, timings, figure):
+        raise NotImplementedError
+
+
+class LoggingAdapter(SignalAdapter):
+    """ Logs rendering phases' durations of each accessed figure """
+
+    def __init__(self, logger='django_matplotlib', level=logging.DEBUG):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str)\
+            else logger
+        self.level = level
+
+    def handle(self, label, hit, timings, figure):
+        self.logger.log(self.level, "%s %s %s", label,
+                        'hit' if hit else 'miss',
+                        ' '.join('%s=%.1fms' % (phase, duration * 1000)
+                                 for phase, duration in sorted(timings.items())))
+
+
+class StatsdAdapter(SignalAdapter):
+    """Sends figures' statistics to StatsD.
+
+    `client` should provide `incr(name)` and `timing(name, ms)` methods
+    (e.g. `statsd.StatsClient`). Metrics are named as
+    `<prefix>.<label>.hit|miss` and `<prefix>.<label>.<phase>`.
+    """
+
+    def __init__(self, client, prefix='django_matplotlib'):
+        self.client = client
+        self.prefix = prefix
+
+    def handle(self, label, hit, timings, figure):
+        name = '%s.%s' % (self.prefix, label)
+        self.client.incr('%s.%s' % (name, 'hit' if hit else 'miss'))
+        for phase, duration in timings.items():
+            self.client.timing('%s.%s' % (name, phase), duration * 1000)
@@ -0,0 +1,168 @@
+import time
+import logging
+import threading
+from datetime import timezone
+from django_matplotlib.fields import defaults, get_storage
+
+logger = logging.getLogger('django_matplotlib')
+
+# suffixes of files which belong to a figure file (compressed copies)
+COPY_SUFFIXES = ('.gz', '.br')
+
+
+def _timestamp(value):
+    if value.tzinfo is None:
+        return value.timestamp()
+    return value.astimezone(timezone.utc).timestamp()
+
+
+class FigureSweeper:
+    """Enforces quotas on figure files (`output_type='file'`).
+
+    Files in `directory` of `storage` are evicted when they weren't used
+    for more than `max_age` seconds, and then in least recently used order
+    while their total size exceeds `max_bytes` or their number exceeds
+    `max_files` (`None` means no limit). Files are considered used when
+    they are modified; fields touch files of local storages when they are
+    reused. Compressed copies of figures (`.gz` and `.br`) are evicted
+    together with them.
+
+    Files used within `grace` seconds are never evicted, so the sweeper
+    can run concurrently with rendering; temporary files of interrupted
+    writes are removed after the grace period.
+    """
+
+    def __init__(self, storage, directory, max_age=None, max_bytes=None,
+                 max_files=None, grace=60):
+        self.storage = storage
+        self.directory = directory.strip('/')
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.grace = grace
+
+    def _get_used_time(self, name):
+        try:
+            return _timestamp(self.storage.get_modified_time(name))
+        except NotImplementedError:
+            return _timestamp(self.storage.get_created_time(name))
+
+    def get_figures(self):
+        """Returns figure files as `(used, size, names)` sorted by time they
+        were used; `names` include compressed copies of the figure.
+        """
+
+        try:
+            file_names = self.storage.listdir(self.directory)[1]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        figures = dict()
+        for file_name in file_names:
+            base_name = file_name
+            for suffix in COPY_SUFFIXES:
+                if file_name.endswith(suffix):
+                    base_name = file_name[:-len(suffix)]
+            name = '%s/%s' % (self.directory, file_name)
+            try:
+                used = self._get_used_time(name)
+                size = self.storage.size(name)
+            except (FileNotFoundError, OSError):
+                # removed concurrently
+                continue
+            figure = figures.setdefault(base_name, [0, 0, []])
+            figure[0] = max(figure[0], used)
+            figure[1] += size
+            figure[2].append(name)
+        return sorted(tuple(figure) for figure in figures.values())
+
+    def _delete(self, names, dry_run):
+        if dry_run:
+            return
+        for name in names:
+            try:
+                self.storage.delete(name)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self, dry_run=False, now=None):
+        """Evicts figure files exceeding quotas.
+
+        Returns statistics: number and total size of evicted (`'files'`,
+        `'bytes'`) and kept (`'kept_files'`, `'kept_bytes'`) figures.
+        """
+
+        now = time.time() if now is None else now
+        figures = self.get_figures()
+        kept_bytes = sum(figure[1] for figure in figures)
+        kept_files = len(figures)
+        stats = {'files': 0, 'bytes': 0}
+        for used, size, names in figures:
+            if now - used < self.grace:
+                # the rest of figures were used recently too
+                break
+            temporary = all(name.rsplit('/', 1)[-1].startswith('.') and
+                            name.endswith('.tmp') for name in names)
+            if not temporary and not (
+                    (self.max_age is not None and now - used > self.max_age) or
+                    (self.max_bytes is not None and kept_bytes > self.max_bytes) or
+                    (self.max_files is not None and kept_files > self.max_files)):
+                continue
+            self._delete(names, dry_run)
+            stats['files'] += 1
+            stats['bytes'] += size
+            kept_files -= 1
+            kept_bytes -= size
+        stats.update({'kept_files': kept_files, 'kept_bytes': kept_bytes})
+        return stats
+
+
+class SweeperThread(threading.Thread):
+    """ Daemon thread which runs the sweeper every `interval` seconds """
+
+    def __init__(self, sweeper, interval):
+        super().__init__(name='django_matplotlib.sweeper', daemon=True)
+        self.sweeper = sweeper
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sweeper.sweep()
+            except Exception:       # noqa
+                logger.exception("Sweeping figure files failed.")
+
+    def stop(self):
+        self._stopped.set()
+
+
+def get_sweeper(storage=None, **options):
+    """Returns sweeper of figure files of `storage` (see
+    :func:`django_matplotlib.fields.get_storage`) configured by
+    `DJANGO_MATPLOTLIB_SWEEPER` setting; `options` override it.
+    """
+
+    kwargs = dict(defaults.DJANGO_MATPLOTLIB_SWEEPER)
+    kwargs.pop('interval', None)
+    kwargs.update(options)
+    return FigureSweeper(get_storage(storage), defaults.DJANGO_MATPLOTLIB_TMP,
+                         **kwargs)
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_sweeper_thread(interval=None):
+    """Starts (once per process) the thread which sweeps figure files of
+    the default storage every `interval` seconds (`interval` of
+    `DJANGO_MATPLOTLIB_SWEEPER` setting by default).
+    """
+
+    global _thread
+    interval = interval or defaults.DJANGO_MATPLOTLIB_SWEEPER.get('interval')
+    with _thread_lock:
+        if _thread is None and interval:
+            _thread = SweeperThread(get_sweeper(), interval)
+            _thread.start()
+    return _thread
@@ -0,0 +1,65 @@
+""" Figure views of test models """
+
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from django_matplotlib.figures import FigureTemplate, subplots, test_figure  # noqa
+
+
+def test_instance_figure(instance, title=None):
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    ax.plot([1, 2, 3, 4], [4, 5, 2, 1])
+    ax.set_title(str(title))
+    return fig
+
+
+def test_slow_figure(seconds):
+    time.sleep(seconds)
+    return test_figure()
+
+
+def test_threadsafe_figure(title=''):
+    fig, ax = subplots()
+    ax.plot([1, 2, 3, 4], [4, 5, 2, 1])
+    ax.set_title(title)
+    return fig
+
+
+def test_axes_figure(title='', ax=None):
+    if ax is None:
+        fig, ax = subplots()
+    title = title or ''
+    ax.plot([1, 2, 3, 4], [4, 5, 2, len(title)])
+    ax.set_title(title)
+    return ax.figure
+
+
+def test_heatmap_figure():
+    fig, ax = subplots()
+    ax.imshow(np.ones((100, 300)), cmap='gray', vmin=0, vmax=2)
+    return fig
+
+
+def test_template_layout(fig):
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_xlim(0, 5)
+    ax.set_ylim(0, 10)
+    ax.grid(True)
+    ax.set_xlabel('x')
+    ax.set_title('Template')
+
+
+def test_template_data(fig, values=(4, 5, 2, 1)):
+    fig.axes[0].plot(range(1, len(values) + 1), values)
+
+
+test_template_figure = FigureTemplate(test_template_layout,
+                                      test_template_data,
+                                      layout='constrained')
+
+
+def test_leaky_figure():
+    plt.figure()
+    fig, ax = plt.subplots()
+    return ax
@@ -14,6 +14,12 @@ INSTALLED_APPS = [
     'django_matplotlib',
 ]
 
+try:
+    import debug_toolbar    # noqa
+    INSTALLED_APPS.append('debug_toolbar')
+except ImportError:
+    pass
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -24,6 +30,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+ROOT_URLCONF = 'django_matplotlib.tests.urls'
 
 TEMPLATES = [
     {
@@ -1,15 +1,59 @@
+import os
+import sys
+import gzip
+import time
+import struct
+import asyncio
+import threading
+import shutil
+import tempfile
 import itertools
+import importlib
+import functools
+from unittest import mock, skipIf
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import matplotlib.image
+import matplotlib.pyplot as plt
 from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import RequestFactory
 from django_matplotlib.fields import MatplotlibFigureField
-from django.db import models
+from django_matplotlib.cache import (FigureModuleCache, RenderCache,
+                                     SharedCache, SingleFlight)
+from django_matplotlib.invalidation import DataGenerations, data_generations
+from django_matplotlib.sweeper import FigureSweeper
+from django_matplotlib.fingerprint import CodeFingerprints
+from django_matplotlib.rendering import (ProcessPoolBackend, RenderTimeout,
+                                         InlineBackend, RenderMonitor,
+                                         apply_tile, render_figure,
+                                         render_thumbnails)
+from django_matplotlib import fields, figures, rendering, stats
+from django_matplotlib.tests import figures as fixtures
+from django_matplotlib.admin import FigureThumbnail, FigureThumbnailsMixin
+from django_matplotlib.fields import render_cache
+from django_matplotlib.forms import MatplotlibWidget
+from django_matplotlib.signals import figure_accessed
+from django.db import connection, models
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
 from django import forms
 from django.shortcuts import render
 from django.template import Template, Context, Engine
 from django.http import HttpResponse
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, Storage
 from django_matplotlib.conf import DJANGO_MATPLOTLIB_TMP
 
+try:
+    from debug_toolbar.toolbar import DebugToolbar
+    from django_matplotlib.panels import FiguresPanel
+except ImportError:
+    DebugToolbar = None
+
 
 #  ------------- test settings -----------------
 
@@ -92,6 +136,33 @@ def create_model(name, fields=None, app_label='',
     return model
 
 
+class MemoryStorage(Storage):
+    """ Minimal non-local storage which keeps files in memory """
+
+    def __init__(self, base_url='/storage/'):
+        self.base_url = base_url
+        self.files = dict()
+
+    def _open(self, name, mode='rb'):
+        return ContentFile(self.files[name], name=name)
+
+    def _save(self, name, content):
+        self.files[name] = content.read()
+        return name
+
+    def exists(self, name):
+        return name in self.files
+
+    def delete(self, name):
+        self.files.pop(name, None)
+
+    def size(self, name):
+        return len(self.files[name])
+
+    def url(self, name):
+        return self.base_url + name
+
+
 def test_wrapper(kw, variable, op, value, ind):
     def test_function(self, kw=kw, variable=variable, op=op,
                         value=value, ind=ind):
@@ -102,7 +173,7 @@ def test_wrapper(kw, variable, op, value, ind):
         def build_env(request):
             sample_model = create_model('SampleModel%s' % ind,
                                         fields={'figure': MatplotlibFigureField(**kw)},
-                                        module='django_matplotlib',
+                                        module='django_matplotlib.tests',
                                         app_label='django_matplotlib')
             class SampleForm(forms.ModelForm):
                 class Meta:
@@ -143,11 +214,1220 @@ class VariationalTestMetaclass(type):
 
 class AutoGeneratedTests(metaclass=VariationalTestMetaclass):
     pass
-    
 
 
+class FigureModuleCacheTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'figures.py')
+        self.write_module('x = 1\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write_module(self, source):
+        with open(self.path, 'w') as f:
+            f.write(source)
+
+    def test_module_is_executed_once(self):
+        modules = FigureModuleCache()
+        module = modules.load(self.path, 'figures')
+        self.assertIs(modules.load(self.path, 'figures'), module)
+
+    def test_module_is_reloaded_when_changed(self):
+        modules = FigureModuleCache()
+        self.assertEqual(modules.load(self.path, 'figures').x, 1)
+        self.write_module('x = 22\n')
+        self.assertEqual(modules.load(self.path, 'figures').x, 22)
+
+    def test_frozen_cache_skips_change_checks(self):
+        modules = FigureModuleCache(frozen=True)
+        self.assertEqual(modules.load(self.path, 'figures').x, 1)
+        self.write_module('x = 22\n')
+        self.assertEqual(modules.load(self.path, 'figures').x, 1)
+
+    def test_missing_module_raises_import_error(self):
+        modules = FigureModuleCache()
+        self.assertRaises(ImportError, modules.load,
+                          os.path.join(self.tmp_dir, 'missing.py'), 'missing')
+
+
+class FileOutputTests(TestCase):
+
+    def get_figure(self, name, **kwargs):
+        kwargs.update({'figure': 'test_figure', 'output_type': 'file'})
+        model = create_model(name, fields={'figure': MatplotlibFigureField(**kwargs)},
+                             module='django_matplotlib.tests',
+                             app_label='django_matplotlib')
+        return model.figure
+
+    def test_identical_figures_share_file(self):
+        first = self.get_figure('FileOutputModel1')
+        second = self.get_figure('FileOutputModel2')
+        self.assertTrue(os.path.exists(first.path))
+        self.assertEqual(first.path, second.path)
+
+    def test_file_name_depends_on_output_parameters(self):
+        first = self.get_figure('FileOutputModel3')
+        second = self.get_figure('FileOutputModel4', fig_width=640)
+        self.assertNotEqual(first.path, second.path)
+
+    def test_reused_files_are_not_cleaned_up(self):
+        path = self.get_figure('FileOutputModel5', fig_width=480).path
+        self.assertIn(path, fields._cleanup_files)
+        # pretend the file was written by another process
+        fields._cleanup_files.discard(path)
+        self.addCleanup(fields.cleanup_file, path)
+        render_cache.clear()
+        self.assertEqual(self.get_figure('FileOutputModel6',
+                                         fig_width=480).path, path)
+        self.assertNotIn(path, fields._cleanup_files)
+
+
+class StorageOutputTests(TestCase):
+
+    def setUp(self):
+        render_cache.clear()
+        self.storage = MemoryStorage(base_url='/storage/')
+        self.model = create_model(
+            'StorageFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_figure', output_type='file',
+                storage=self.storage)},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+
+    def test_figure_is_saved_to_storage(self):
+        figure = self.model.figure
+        self.assertEqual(figure.path, '')
+        self.assertTrue(self.storage.exists(figure.name))
+        self.assertEqual(figure.url, '/storage/' + figure.name)
+        self.assertEqual(figure.content[:4], b'\x89PNG')
+
+    def test_figure_in_storage_is_reused(self):
+        figure = self.model.figure
+        render_cache.clear()
+        renders = fields.render_monitor.stats()['renders']
+        self.assertEqual(self.model.figure.name, figure.name)
+        self.assertEqual(fields.render_monitor.stats()['renders'], renders)
+
+
+class SweeperTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.storage = FileSystemStorage(location=self.tmp_dir)
+        self.now = time.time()
+
+    def create(self, name, age, size=10):
+        path = os.path.join(self.tmp_dir, 'figures', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        os.utime(path, (self.now - age, self.now - age))
+        return path
+
+    def sweep(self, **quotas):
+        return FigureSweeper(self.storage, 'figures', **quotas).sweep(now=self.now)
+
+    def test_old_files_are_removed(self):
+        old = self.create('old.svg', 1000)
+        old_copy = self.create('old.svg.gz', 1000)
+        new = self.create('new.svg', 100)
+        stats = self.sweep(max_age=500)
+        self.assertEqual((stats['files'], stats['kept_files']), (1, 1))
+        self.assertFalse(os.path.exists(old) or os.path.exists(old_copy))
+        self.assertTrue(os.path.exists(new))
+
+    def test_least_recently_used_files_are_removed(self):
+        paths = [self.create('%s.png' % age, age) for age in (300, 200, 100)]
+        self.sweep(max_files=1)
+        self.assertEqual([os.path.exists(path) for path in paths],
+                         [False, False, True])
+        self.sweep(max_bytes=5)
+        self.assertFalse(os.path.exists(paths[2]))
+
+    def test_recently_used_files_are_kept(self):
+        path = self.create('recent.png', 10)
+        tmp_path = self.create('.old.tmp', 1000)
+        self.sweep(max_files=0, grace=60)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(tmp_path))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('sweep_figures', '--dry-run', '--max-age', '0',
+                     stdout=out)
+        self.assertIn('Would remove', out.getvalue())
+
+    def test_thread_is_started_by_app_config(self):
+        from django.apps import apps
+        from django_matplotlib.apps import DjangoMatplotlibConfig
+        self.assertIsInstance(apps.get_app_config('django_matplotlib'),
+                              DjangoMatplotlibConfig)
+
+
+class InstanceFigureTests(TestCase):
+
+    def setUp(self):
+        self.model = create_model(
+            'InstanceFigureModel',
+            fields={'title': models.CharField(max_length=10),
+                    'figure': MatplotlibFigureField(
+                        figure='test_instance_figure', pass_instance=True,
+                        instance_fields=('title', ))},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+
+    def test_figure_depends_on_instance(self):
+        first = self.model(pk=1, title='first').figure
+        second = self.model(pk=2, title='second').figure
+        self.assertNotEqual(first.source, second.source)
+
+    def test_figure_is_cached_per_instance(self):
+        instance = self.model(pk=1, title='first')
+        self.assertIs(instance.figure, instance.figure)
+        instance.title = 'changed'
+        self.assertIsNot(instance.figure, self.model(pk=1, title='first').figure)
+
+
+class RenderCacheTests(TestCase):
+
+    def test_hits_and_misses_are_counted(self):
+        cache = RenderCache()
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', 'value', 5)
+        self.assertEqual(cache.get('key'), 'value')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes']),
+                         (1, 1, 5))
+
+    def test_least_recently_used_items_are_evicted(self):
+        cache = RenderCache(max_bytes=10)
+        cache.set('first', 1, 4)
+        cache.set('second', 2, 4)
+        cache.get('first')
+        cache.set('third', 3, 4)
+        self.assertNotIn('second', cache)
+        self.assertIn('first', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['bytes'], 8)
+
+    def test_entries_limit(self):
+        cache = RenderCache(max_entries=2)
+        for key in range(5):
+            cache.set(key, key, 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_items_are_evicted(self):
+        cache = RenderCache(ttl=0)
+        cache.set('key', 'value', 1)
+        time.sleep(0.01)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+
+class FigureValidationTests(TestCase):
+
+    def test_full_clean_does_not_render(self):
+        model = create_model(
+            'ValidatedFigureModel',
+            fields={'title': models.CharField(max_length=10),
+                    'figure': MatplotlibFigureField(
+                        figure='test_axes_figure', instance_fields=('title', ))},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        instance = model(title='valid')
+        renders = fields.render_monitor.stats()['renders']
+        instance.full_clean()
+        self.assertEqual(fields.render_monitor.stats()['renders'], renders)
+        self.assertEqual(instance.figure.format, 'png')
+
+
+class FigureViewTests(TestCase):
+
+    def setUp(self):
+        self.model = create_model(
+            'FigureViewModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure',
+                                                    output_type='url')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        self.url = '/figures/django_matplotlib/figureviewmodel/figure/'
+
+    def test_widget_refers_to_view(self):
+        self.assertTrue(self.model.figure.url.startswith(self.url))
+
+    def test_figure_is_served(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], '"%s"' % self.model.figure.digest)
+        self.assertIn('max-age', response['Cache-Control'])
+
+    def test_conditional_request(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_field(self):
+        response = self.client.get('/figures/django_matplotlib/figureviewmodel/nofield/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_url_depends_on_model(self):
+        other = create_model(
+            'OtherFigureViewModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure',
+                                                    output_type='url')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        self.assertTrue(self.model.figure.url.startswith(self.url))
+        self.assertIn('/otherfigureviewmodel/', other.figure.url)
+
+    def test_unsaved_instance_has_no_pk(self):
+        model = create_model(
+            'FigureViewInstanceModel',
+            fields={'title': models.CharField(max_length=10),
+                    'figure': MatplotlibFigureField(
+                        figure='test_axes_figure', instance_fields=('title', ),
+                        output_type='url')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        url = model(title='unsaved').figure.url
+        self.assertTrue(url.startswith(
+            '/figures/django_matplotlib/figureviewinstancemodel/figure/?v='))
+
+
+class TiledFigureTests(TestCase):
+
+    def setUp(self):
+        self.model = create_model(
+            'TiledFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_figure', output_type='tiles', tile_size=64,
+                max_zoom=2)},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        self.url = '/figures/django_matplotlib/tiledfiguremodel/figure/tiles/'
+
+    def test_tile_limits(self):
+        fig = figures.figure()
+        ax = fig.add_subplot(1, 1, 1)
+        ax.set_xlim(0, 4)
+        ax.set_ylim(0, 4)
+        apply_tile(fig, 1, 1, 0)
+        self.assertEqual((ax.get_xlim(), ax.get_ylim()), ((2, 4), (2, 4)))
+
+    def test_widget_refers_to_tiles(self):
+        figure = self.model.figure
+        self.assertTrue(figure.url.startswith(self.url + '{z}/{x}/{y}/'))
+        html = MatplotlibWidget().render('test', figure)
+        self.assertIn('django-matplotlib-tiles', html)
+
+    def test_tile_is_served(self):
+        response = self.client.get(self.url + '2/3/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(struct.unpack('>II', response.content[16:24]),
+                         (64, 64))
+        etag = response['ETag']
+        self.assertNotEqual(self.client.get(self.url + '2/3/2/')['ETag'], etag)
+        self.assertEqual(self.client.get(self.url + '2/3/1/')['ETag'], etag)
+
+    def test_fields_have_own_tiles(self):
+        other = create_model(
+            'OtherTiledFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_figure', output_type='tiles', tile_size=64,
+                max_zoom=6)},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        figure, other_figure = self.model.figure, other.figure
+        self.assertNotEqual(figure.digest, other_figure.digest)
+        self.assertEqual(other_figure.tiles['max_zoom'], 6)
+        self.assertIn('/othertiledfiguremodel/', other_figure.url)
+
+    def test_tiles_of_image_are_covered(self):
+        model = create_model(
+            'TiledHeatmapModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_heatmap_figure', output_type='tiles',
+                tile_size=64, max_zoom=1)},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        field = model._meta.get_field('figure')
+        for x, y in itertools.product((0, 1), repeat=2):
+            image = matplotlib.image.imread(
+                BytesIO(field.get_tile(None, 1, x, y).content))
+            # no blank (white) pixels are left around the image
+            self.assertTrue(np.all(image[:, :, :3] < 0.9))
+
+    def test_tiles_are_reported(self):
+        stats.registry.reset()
+        render_cache.clear()
+        field = self.model._meta.get_field('figure')
+        field.get_tile(None, 1, 0, 0)
+        field.get_tile(None, 1, 0, 0)
+        figure_stats = stats.registry.snapshot()[
+            'django_matplotlib.TiledFigureModel.figure']
+        self.assertEqual((figure_stats['hits'], figure_stats['misses']), (1, 1))
+        self.assertEqual(figure_stats['phases']['call']['count'], 1)
+
+    def test_missing_tile(self):
+        self.assertEqual(self.client.get(self.url + '1/2/0/').status_code, 404)
+        self.assertEqual(self.client.get(self.url + '3/0/0/').status_code, 404)
+
+
+class FigureThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = create_model(
+            'ThumbnailModel',
+            fields={'title': models.CharField(max_length=10),
+                    'figure': MatplotlibFigureField(
+                        figure='test_axes_figure', instance_fields=('title', ),
+                        output_format='svg')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        with connection.schema_editor() as editor:
+            editor.create_model(cls.model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(cls.model)
+
+    def setUp(self):
+        render_cache.clear()
+        for title in ('a', 'bb', 'ccc'):
+            self.model.objects.create(title=title)
+
+    def test_thumbnails_are_cached_apart(self):
+        instance = self.model.objects.first()
+        thumbnail = FigureThumbnail('figure', 60, 40)(instance)
+        self.assertIn('data:image/png;base64', thumbnail)
+        self.assertIn('width="60" height="40"', thumbnail)
+        fig_object = instance.figure
+        self.assertEqual(fig_object.format, 'svg')
+        field = self.model._meta.get_field('figure')
+        digest = field.get_thumbnails([instance], 60, 40)[0].digest
+        self.assertTrue(digest.startswith('thumbnail:'))
+        self.assertNotEqual(digest, fig_object.digest)
+
+    def test_thumbnails_are_reported(self):
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(kwargs)
+        field = self.model._meta.get_field('figure')
+        instances = list(self.model.objects.all()[:2])
+        figure_accessed.connect(receiver)
+        try:
+            field.get_thumbnails(instances, 60, 40)
+            field.get_thumbnails(instances, 60, 40)
+        finally:
+            figure_accessed.disconnect(receiver)
+        self.assertEqual([kwargs['hit'] for kwargs in received],
+                         [False, False, True, True])
+        self.assertEqual([kwargs['instance'] for kwargs in received],
+                         instances * 2)
+        self.assertIn('call', received[0]['timings'])
+        self.assertNotIn('call', received[2]['timings'])
+
+    def test_figure_is_reused(self):
+        axes = []
+
+        def view(title, ax=None):
+            axes.append(ax)
+            return fixtures.test_axes_figure(title, ax=ax)
+
+        calls = [((title, ), {}) for title in ('a', 'bb', 'a')]
+        first, second, third = render_thumbnails(view, 'view', calls,
+                                                 size=(60, 40), dpi=20)
+        self.assertEqual(len(set(map(id, axes))), 1)
+        self.assertEqual(struct.unpack('>II', first[16:24]), (60, 40))
+        self.assertNotEqual(first, second)
+        # data artists of previous renders are cleared
+        self.assertEqual(first, third)
+        self.assertEqual(first, render_thumbnails(view, 'view', calls[:1],
+                                                  size=(60, 40), dpi=20)[0])
+
+    def test_changelist_renders_batch(self):
+        class ThumbnailAdmin(FigureThumbnailsMixin, admin.ModelAdmin):
+            list_display = ('title', 'thumbnail')
+            thumbnail = FigureThumbnail('figure', description='Preview')
+
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser('admin', '', 'secret')
+        model_admin = ThumbnailAdmin(self.model, admin.AdminSite())
+        with mock.patch.object(rendering, 'render_thumbnails',
+                               wraps=rendering.render_thumbnails) as batch:
+            changelist = model_admin.get_changelist_instance(request)
+            cells = [model_admin.thumbnail(obj)
+                     for obj in changelist.result_list]
+        self.assertEqual(batch.call_count, 1)
+        self.assertEqual(len(batch.call_args[0][2]), 3)
+        self.assertEqual(len(set(cells)), 3)
+        self.assertEqual(changelist.get_thumbnail_columns(),
+                         [ThumbnailAdmin.thumbnail])
+
+
+class FigureTemplateTests(TestCase):
+
+    def setUp(self):
+        self.template = figures.FigureTemplate(fixtures.test_template_layout,
+                                               fixtures.test_template_data,
+                                               layout='constrained')
+
+    @staticmethod
+    def read_png(data):
+        return matplotlib.image.imread(BytesIO(data))
+
+    def test_blitted_figure_matches_full_draw(self):
+        for bbox_inches in (None, 'tight'):
+            blitted = render_figure(self.template, 'template', ((1, 3, 9), ),
+                                    {}, size=(320, 240), dpi=100,
+                                    bbox_inches=bbox_inches)
+            fig = self.template((1, 3, 9))
+            fig.set_size_inches(3.2, 2.4)
+            buffer = BytesIO()
+            fig.savefig(buffer, format='png', dpi=100, bbox_inches=bbox_inches)
+            blitted, drawn = map(self.read_png, (blitted, buffer.getvalue()))
+            self.assertEqual(blitted.shape, drawn.shape)
+            self.assertLess(np.abs(blitted - drawn).mean(), 0.01)
+        self.assertEqual(len(self.template._layers), 2)
+
+    def test_only_data_is_redrawn(self):
+        first = self.template.render(((1, 3, 9), ), size=(160, 120))
+        fig = self.template._layers[((160, 120), None, False)][0]
+        children = fig.axes[0].get_children()
+        second = self.template.render(((9, 3, 1), ), size=(160, 120))
+        self.assertFalse(np.array_equal(first, second))
+        # data artists of previous renders are removed
+        self.assertEqual(fig.axes[0].get_children(), children)
+        np.testing.assert_array_equal(
+            self.template.render(((1, 3, 9), ), size=(160, 120)), first)
+
+    def test_overflowing_layer_is_drawn(self):
+        template = figures.FigureTemplate(fixtures.test_template_layout,
+                                          fixtures.test_template_data)
+        self.assertIsNone(template.render(size=(100, 80), tight=True))
+        data = render_figure(template, 'template', (), {}, size=(100, 80),
+                             dpi=100, bbox_inches='tight')
+        self.assertGreater(self.read_png(data).shape[0], 80)
+
+    def test_field_renders_template(self):
+        model = create_model(
+            'TemplateFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_template_figure')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        fig_object = model.figure
+        self.assertFalse(fig_object.error)
+        self.assertTrue(fig_object.content.startswith(b'\x89PNG'))
+        template = model._meta.get_field('figure')._figure_module\
+            .test_template_figure
+        self.assertEqual(len(template._layers), 1)
+
+    def test_fingerprint_covers_functions(self):
+        fingerprints = CodeFingerprints()
+        fingerprint = fingerprints.get(self.template)
+        for other in (figures.FigureTemplate(fixtures.test_template_layout,
+                                             fixtures.test_axes_figure,
+                                             layout='constrained'),
+                      figures.FigureTemplate(fixtures.test_template_layout,
+                                             fixtures.test_template_data)):
+            self.assertNotEqual(fingerprints.get(other), fingerprint)
+        # cached layers don't change it
+        self.template.render(size=(160, 120))
+        self.assertEqual(fingerprints.get(self.template), fingerprint)
+
+
+class ProcessPoolBackendTests(TestCase):
+
+    def setUp(self):
+        self.backend = ProcessPoolBackend(workers=1, max_renders=2, timeout=5)
+
+    def tearDown(self):
+        self.backend.close()
+
+    def test_figure_is_rendered(self):
+        data = self.backend.render(fixtures.test_figure, 'test_figure',
+                                   tuple(), dict(), format='png')
+        self.assertTrue(data.startswith(b'\x89PNG'))
+
+    def test_workers_are_recycled(self):
+        for _ in range(3):
+            self.backend.render(fixtures.test_figure, 'test_figure',
+                                tuple(), dict(), format='svg')
+        self.assertEqual(self.backend._idle[0].renders, 1)
+
+    def test_workers_are_not_forked(self):
+        self.assertIn(self.backend._context.get_start_method(),
+                      ('forkserver', 'spawn'))
+
+    def test_errors_are_reraised(self):
+        self.assertRaises(TypeError, self.backend.render, fixtures.test_figure,
+                          'test_figure', (1, ), dict(), format='png')
+
+    def test_template_is_rendered(self):
+        model = create_model(
+            'PooledTemplateModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_template_figure')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        with mock.patch.object(fields, 'render_backend', self.backend):
+            fig_object = model.figure
+        self.assertFalse(fig_object.error)
+        self.assertEqual(self.backend._idle[0].renders, 1)
+
+    def test_runaway_render_is_killed(self):
+        self.backend.timeout = 0.5
+        self.assertRaises(RenderTimeout, self.backend.render,
+                          fixtures.test_slow_figure, 'test_slow_figure',
+                          (10, ), dict(), format='png')
+        self.assertEqual(self.backend._idle, [])
+
+
+class ThreadSafeRenderingTests(TestCase):
+
+    def test_concurrent_renders(self):
+        def render(title):
+            return render_figure(fixtures.test_threadsafe_figure,
+                                 'test_threadsafe_figure', (title, ), dict(),
+                                 format='svg', threadsafe=True)
+        titles = ['title%s' % i for i in range(16)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(render, titles))
+        for title, data in zip(titles, results):
+            self.assertIn(title, data.decode('utf-8'))
+
+    def test_figures_are_not_registered_in_pyplot(self):
+        fignums = plt.get_fignums()
+        fig, ax = figures.subplots(1, 2)
+        self.assertEqual(len(ax), 2)
+        self.assertEqual(plt.get_fignums(), fignums)
+
+
+class SingleFlightTests(TestCase):
+
+    def test_concurrent_calls_are_collapsed(self):
+        flights = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def func():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'result'
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(flights.do, 'key', func)
+            started.wait()
+            others = [executor.submit(flights.do, 'key', func) for _ in range(3)]
+            results = [first.result()] + [f.result() for f in others]
+        self.assertEqual(results, ['result'] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(flights), 0)
+
+    def test_async_accessor(self):
+        model = create_model(
+            'AsyncFigureModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        field = model._meta.get_field('figure')
+        loop = asyncio.new_event_loop()
+        try:
+            fig_object = loop.run_until_complete(field.aget())
+        finally:
+            loop.close()
+        self.assertTrue(fig_object.source)
+        self.assertIs(fig_object, model.figure)
+
+    def test_async_accessor_of_instance(self):
+        model = create_model(
+            'AsyncInstanceFigureModel',
+            fields={'title': models.CharField(max_length=10),
+                    'figure': MatplotlibFigureField(
+                        figure='test_axes_figure', instance_fields=('title', ))},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        field = model._meta.get_field('figure')
+        instance = model(title='async')
+        closed = []
+        with mock.patch.object(fields.connections, 'close_all',
+                               side_effect=lambda: closed.append(True)):
+            loop = asyncio.new_event_loop()
+            try:
+                fig_object = loop.run_until_complete(field.aget(instance))
+            finally:
+                loop.close()
+        self.assertIs(fig_object, instance.figure)
+        self.assertIsNot(fig_object, model(title='other').figure)
+        self.assertEqual(closed, [True])
+
+
+class WarmFiguresCommandTests(TestCase):
+
+    def test_figures_are_rendered(self):
+        model = create_model(
+            'WarmupModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure',
+                                                    output_type='file',
+                                                    fig_width=310),
+                    'broken': MatplotlibFigureField(figure='no_figure',
+                                                    output_type='file',
+                                                    silent=True)},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        create_model('WarmupOtherModel',
+                     fields={'figure': MatplotlibFigureField(
+                         figure='test_figure', output_type='file')},
+                     module='django_matplotlib.tests', app_label='django_matplotlib')
+        render_cache.clear()
+        stdout, stderr = StringIO(), StringIO()
+        with self.assertRaises(CommandError):
+            call_command('warm_figures', 'django_matplotlib.WarmupModel',
+                         workers=2, stdout=stdout, stderr=stderr)
+        self.assertIn('django_matplotlib.WarmupModel.figure rendered',
+                      stdout.getvalue())
+        self.assertIn('django_matplotlib.WarmupModel.broken failed',
+                      stderr.getvalue())
+        # only figures of the given model are rendered
+        self.assertNotIn('WarmupOtherModel', stdout.getvalue())
+        self.assertEqual(len(stdout.getvalue().splitlines()), 1)
+        # the rendered file outlives the command
+        path = model.figure.path
+        self.addCleanup(fields.cleanup_file, path)
+        self.assertTrue(os.path.exists(path))
+        self.assertNotIn(path, fields._cleanup_files)
+
+    def test_figures_in_memory_are_skipped(self):
+        create_model('WarmupStringModel',
+                     fields={'figure': MatplotlibFigureField(figure='test_figure')},
+                     module='django_matplotlib.tests', app_label='django_matplotlib')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('warm_figures', 'django_matplotlib.WarmupStringModel',
+                     stdout=stdout, stderr=stderr)
+        self.assertIn('WarmupStringModel.figure skipped', stderr.getvalue())
+        self.assertIn('0 figures rendered', stdout.getvalue())
+
+    def test_figures_are_shared(self):
+        shared = SharedCache('default', key_prefix='test_warmup')
+        fields.shared_cache = shared
+        self.addCleanup(setattr, fields, 'shared_cache', None)
+        model = create_model(
+            'WarmupSharedModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        render_cache.clear()
+        call_command('warm_figures', 'django_matplotlib.WarmupSharedModel',
+                     stdout=StringIO(), stderr=StringIO())
+        render_cache.clear()
+        self.assertIsNotNone(shared.get(model.figure.digest))
+
+    def test_unknown_model(self):
+        stdout, stderr = StringIO(), StringIO()
+        for label in ('django_matplotlib.UnknownModel', 'nosuchapp'):
+            with self.assertRaisesRegex(CommandError,
+                                        label.split('.')[-1]):
+                call_command('warm_figures', label, stdout=stdout,
+                             stderr=stderr)
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertEqual(stderr.getvalue(), '')
+
+
+class FigureSizeTests(TestCase):
+
+    def get_png_size(self, **kwargs):
+        kwargs.update({'figure': 'test_figure', 'output_format': 'png'})
+        model = create_model('FigureSizeModel%s' % len(kwargs),
+                             fields={'figure': MatplotlibFigureField(**kwargs)},
+                             module='django_matplotlib.tests',
+                             app_label='django_matplotlib')
+        data = model.figure.content
+        return struct.unpack('>II', data[16:24])
+
+    def test_figure_is_rendered_at_requested_size(self):
+        self.assertEqual(self.get_png_size(fig_width=200, fig_height='150px',
+                                           fig_dpi=50),
+                         (200, 150))
+
+    def test_cropped_figure_has_no_fixed_size(self):
+        model = create_model('FigureSizeModelTight',
+                             fields={'figure': MatplotlibFigureField(
+                                 figure='test_figure', tight_bbox=True)},
+                             module='django_matplotlib.tests',
+                             app_label='django_matplotlib')
+        fig_object = model.figure
+        self.assertIsNone(fig_object.width)
+        self.assertIsNone(fig_object.height)
+
+
+class RasterFormatTests(TestCase):
+
+    def get_figure(self, name, **kwargs):
+        kwargs['figure'] = 'test_figure'
+        model = create_model(name, fields={'figure': MatplotlibFigureField(**kwargs)},
+                             module='django_matplotlib.tests',
+                             app_label='django_matplotlib')
+        return model.figure
+
+    def test_unknown_options_are_reported(self):
+        for format, options in (('svg', {'quality': 80}),
+                                ('png', {'precision': 2})):
+            field = MatplotlibFigureField(figure='test_figure',
+                                          output_format=format,
+                                          output_options=options)
+            errors = field._check_fig_format()
+            self.assertEqual([error.id for error in errors],
+                             ['django_matplotlib.E006'])
+            self.assertIn(list(options)[0], errors[0].msg)
+        field = MatplotlibFigureField(figure='test_figure',
+                                      output_format='webp',
+                                      output_options={'quality': 80})
+        self.assertEqual(field._check_fig_format(), [])
+
+    def test_webp_output(self):
+        figure = self.get_figure('WebpFigureModel', output_format='webp',
+                                 output_options={'quality': 80})
+        self.assertEqual(figure.content_type, 'image/webp')
+        self.assertEqual(figure.content[:4], b'RIFF')
+        self.assertEqual(figure.content[8:12], b'WEBP')
+
+    def test_jpeg_output(self):
+        figure = self.get_figure('JpegFigureModel', output_format='jpeg')
+        self.assertEqual(figure.content[:3], b'\xff\xd8\xff')
+        html = MatplotlibWidget().render('test', figure)
+        self.assertIn('data:image/jpeg;base64,', html)
+
+    def test_quantized_png_is_smaller(self):
+        plain = self.get_figure('PlainPngFigureModel')
+        quantized = self.get_figure('QuantizedPngFigureModel',
+                                    output_options={'colors': 16,
+                                                    'optimize': True})
+        self.assertEqual(quantized.content[:8], b'\x89PNG\r\n\x1a\n')
+        self.assertLess(quantized.nbytes, plain.nbytes)
+
+
+class SvgOutputTests(TestCase):
+
+    def get_figure(self, name, **kwargs):
+        kwargs.update({'figure': 'test_figure', 'output_format': 'svg'})
+        model = create_model(name, fields={'figure': MatplotlibFigureField(**kwargs)},
+                             module='django_matplotlib.tests',
+                             app_label='django_matplotlib')
+        return model.figure
+
+    def test_minified_svg_is_smaller(self):
+        plain = self.get_figure('PlainSvgFigureModel')
+        minified = self.get_figure('MinifiedSvgFigureModel',
+                                   output_options={'precision': 1,
+                                                   'minify': True})
+        self.assertIn('<metadata>', plain.source)
+        self.assertNotIn('<metadata>', minified.source)
+        self.assertTrue(minified.source.startswith('<svg'))
+        self.assertLess(minified.nbytes, plain.nbytes)
+
+    def test_precompressed_files(self):
+        figure = self.get_figure('PrecompressedSvgFigureModel',
+                                 output_type='file', precompress=True)
+        with gzip.open(figure.path + '.gz') as f:
+            self.assertEqual(f.read(), figure.content)
+
+
+class LazyFormFieldTests(TestCase):
+
+    def setUp(self):
+        model = create_model(
+            'LazyFormModel',
+            fields={'title': models.CharField(max_length=10),
+                    'figure': MatplotlibFigureField(figure='test_figure')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        self.form_class = forms.modelform_factory(model, fields='__all__')
+        self.instance = model(title='title')
+
+    def test_form_validation_doesnt_render(self):
+        form = self.form_class({'title': 'changed'}, instance=self.instance)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.changed_data, ['title'])
+        form.save(commit=False)
+        self.assertFalse(form['figure'].initial.evaluated)
+
+    def test_figure_is_rendered_with_widget(self):
+        form = self.form_class()
+        self.assertFalse(form.fields['figure'].initial.evaluated)
+        self.assertIn('data:image/png;base64,', str(form['figure']))
+
+    def test_bound_form_shows_figure(self):
+        form = self.form_class({'title': 'title'}, instance=self.instance)
+        self.assertIn('data:image/png;base64,', str(form['figure']))
+
+
+class FingerprintTests(TestCase):
+
+    def get_view(self, source):
+        namespace = dict()
+        exec(source, namespace)
+        return namespace['view']
+
+    def test_helper_changes_are_detected(self):
+        fingerprints = CodeFingerprints()
+        view = "def view():\n    return helper()\n"
+        first = self.get_view(view + "def helper():\n    return 1\n")
+        second = self.get_view(view + "def helper():\n    return 2\n")
+        same = self.get_view(view + "def helper():\n    return 1\n")
+        self.assertNotEqual(fingerprints.get(first), fingerprints.get(second))
+        self.assertEqual(fingerprints.get(first), fingerprints.get(same))
+
+    def test_dependency_modules_are_reloaded(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        sys.path.insert(0, tmp_dir)
+        self.addCleanup(sys.path.remove, tmp_dir)
+        self.addCleanup(sys.modules.pop, 'djmpl_models', None)
+        self.addCleanup(sys.modules.pop, 'djmpl_helper', None)
+        files = {
+            'djmpl_models.py': '',
+            'figures.py': "from django_matplotlib.figures import subplots\n"
+                          "from djmpl_helper import TITLE\n"
+                          "def view():\n"
+                          "    fig, ax = subplots()\n"
+                          "    ax.set_title(TITLE)\n"
+                          "    return fig\n",
+            'djmpl_helper.py': "TITLE = 'first'\n",
+        }
+        for name, source in files.items():
+            with open(os.path.join(tmp_dir, name), 'w') as f:
+                f.write(source)
+        importlib.import_module('djmpl_models')
+        model = create_model(
+            'ReloadedFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='view', depends_on=('djmpl_helper', ))},
+            module='djmpl_models', app_label='django_matplotlib')
+        first = model.figure
+        with open(os.path.join(tmp_dir, 'djmpl_helper.py'), 'w') as f:
+            f.write("TITLE = 'second title'\n")
+        second = model.figure
+        self.assertNotEqual(second.digest, first.digest)
+        self.assertNotEqual(second.source, first.source)
+        self.assertEqual(sys.modules['djmpl_helper'].TITLE, 'second title')
+
+    def test_partials_are_distinguished(self):
+        fingerprints = CodeFingerprints()
+        small = functools.partial(fixtures.test_threadsafe_figure, 'small')
+        large = functools.partial(fixtures.test_threadsafe_figure, 'large')
+        self.assertNotEqual(fingerprints.get(small), fingerprints.get(large))
+        self.assertRaises(TypeError, fingerprints.get, len)
+
+    def test_figure_name_is_hashed(self):
+        model = create_model(
+            'NamedFigureModel',
+            fields={'first': MatplotlibFigureField(figure='test_figure'),
+                    'second': MatplotlibFigureField(
+                        figure='test_instance_figure')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        first, second = (model._meta.get_field(name)
+                         for name in ('first', 'second'))
+        self.assertNotEqual(first._get_figure_hash(fixtures.test_figure),
+                            second._get_figure_hash(fixtures.test_figure))
+
+    def test_data_file_changes_are_detected(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'data.csv')
+        with open(path, 'w') as f:
+            f.write('1,2')
+        model = create_model(
+            'DependentFigureModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure',
+                                                    depends_on=(path, ))},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        first = model.figure
+        self.assertIs(model.figure, first)
+        with open(path, 'w') as f:
+            f.write('1,2,3')
+        self.assertNotEqual(model.figure.digest, first.digest)
+
+
+class DataInvalidationTests(TestCase):
+
+    def setUp(self):
+        self.model = create_model(
+            'DataFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_figure', invalidate_on=('auth.Group', ))},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+
+    def test_figure_is_invalidated_on_save_and_delete(self):
+        first = self.model.figure
+        group = Group.objects.create(name='group')
+        second = self.model.figure
+        self.assertNotEqual(second.digest, first.digest)
+        self.assertIs(self.model.figure, second)
+        group.delete()
+        self.assertNotEqual(self.model.figure.digest, second.digest)
+
+    def test_figure_is_invalidated_on_m2m_changes(self):
+        group = Group.objects.create(name='group')
+        user = User.objects.create(username='user')
+        first = self.model.figure
+        user.groups.add(group)
+        self.assertNotEqual(self.model.figure.digest, first.digest)
+
+    def test_unrelated_changes_are_ignored(self):
+        first = self.model.figure
+        User.objects.create(username='user')
+        self.assertIs(self.model.figure, first)
+
+    def test_local_generations_are_not_shared(self):
+        # e.g. generations of another process or of the previous run
+        other = DataGenerations()
+        self.assertNotEqual(other.get('auth.group'),
+                            data_generations.get('auth.group'))
+
+    def test_evicted_generation_is_not_reused(self):
+        shared = SharedCache('default', key_prefix='test_evicted')
+        generations = DataGenerations(shared)
+        first = generations.get('auth.group')
+        generations.bump('auth.group')
+        second = generations.get('auth.group')
+        shared.delete('generation:auth.group')
+        self.assertNotIn(generations.get('auth.group'), (first, second))
+        shared.delete('generation:auth.group')
+        generations.bump('auth.group')
+        self.assertNotIn(generations.get('auth.group'), (first, second))
+
+
+class SharedCacheTests(TestCase):
+
+    def setUp(self):
+        self.shared = SharedCache('default', key_prefix='test_shared')
+        fields.shared_cache = data_generations.shared = self.shared
+        self.addCleanup(setattr, fields, 'shared_cache', None)
+        self.addCleanup(setattr, data_generations, 'shared', None)
+        self.model = create_model(
+            'SharedFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_figure', invalidate_on=('auth.Group', ))},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+
+    def test_figure_is_shared(self):
+        figure = self.model.figure
+        render_cache.clear()
+        renders = fields.render_monitor.stats()['renders']
+        shared = self.model.figure
+        self.assertEqual(shared.source, figure.source)
+        self.assertEqual(fields.render_monitor.stats()['renders'], renders)
+
+    def test_thumbnails_of_file_figures_are_shared(self):
+        model = create_model(
+            'SharedFileFigureModel',
+            fields={'figure': MatplotlibFigureField(
+                figure='test_figure', output_type='file')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        field = model._meta.get_field('figure')
+        thumbnail, = field.get_thumbnails([None])
+        render_cache.clear()
+        with mock.patch.object(rendering, 'render_thumbnails') as render:
+            shared, = field.get_thumbnails([None])
+        self.assertFalse(render.called)
+        self.assertEqual(shared.source, thumbnail.source)
+
+    def test_generations_are_shared(self):
+        digest = self.model.figure.digest
+        self.shared.incr('generation:auth.group')
+        self.assertNotEqual(self.model.figure.digest, digest)
+
+
+class DecimationTests(TestCase):
+
+    def setUp(self):
+        self.x = np.linspace(0, 100, 100000)
+        self.y = np.sin(self.x) + np.random.RandomState(0).normal(size=100000)
+
+    def test_minmax_keeps_extremes(self):
+        x, y = figures.decimate(self.x, self.y, 1000)
+        self.assertLessEqual(len(x), 1002)
+        self.assertEqual((x[0], x[-1]), (self.x[0], self.x[-1]))
+        self.assertEqual((y.min(), y.max()), (self.y.min(), self.y.max()))
+        self.assertTrue(np.all(np.diff(x) >= 0))
+
+    def test_minmax_keeps_gaps(self):
+        gapped = self.y.copy()
+        gapped[40000:60000] = np.nan
+        x, y = figures.decimate(self.x, gapped, 1000)
+        gap = np.flatnonzero(np.isnan(y))
+        self.assertEqual(len(gap), 2)
+        self.assertEqual((x[gap[0] - 1], x[gap[-1] + 1]),
+                         (self.x[39999], self.x[60000]))
+        self.assertEqual((np.nanmin(y), np.nanmax(y)),
+                         (np.nanmin(gapped), np.nanmax(gapped)))
+
+    def test_lttb(self):
+        x, y = figures.decimate(self.x, self.y, 500, method='lttb')
+        self.assertEqual(len(x), 500)
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+    def test_figure_is_decimated(self):
+        fig, ax = figures.subplots(figsize=(4, 3), dpi=100)
+        line, = ax.plot(self.x, self.y)
+        scatter = ax.scatter(self.x, self.y)
+        unsorted, = ax.plot(self.x[::-1], self.y)
+        figures.decimate_figure(fig)
+        self.assertLess(len(line.get_xdata()), 1000)
+        self.assertLess(len(scatter.get_offsets()), 100000)
+        self.assertEqual(len(unsorted.get_xdata()), 100000)
+
+
+class FigureCleanupTests(TestCase):
+
+    def test_figures_are_closed_on_errors(self):
+        fignums = plt.get_fignums()
+        self.assertRaises(TypeError, render_figure, fixtures.test_leaky_figure,
+                          'test_leaky_figure', tuple(), dict())
+        self.assertEqual(plt.get_fignums(), fignums)
+
+    def test_renders_are_counted(self):
+        monitor = RenderMonitor()
+        data = render_figure(fixtures.test_figure, 'test_figure', tuple(),
+                             dict(), monitor=monitor)
+        stats = monitor.stats()
+        self.assertEqual(stats['renders'], 1)
+        self.assertEqual(stats['last_bytes'], len(data))
+
+    def test_guard_warns(self):
+        backend = InlineBackend(RenderMonitor(max_live_figures=0))
+        fig = figures.figure()
+        with self.assertWarns(ResourceWarning):
+            backend.render(lambda: fig, 'lambda', tuple(), dict())
+
+    def test_guard_recycles(self):
+        backend = InlineBackend(RenderMonitor(max_live_figures=0,
+                                              action='recycle'))
+        backend.render(fixtures.test_threadsafe_figure, 'test_threadsafe_figure',
+                       tuple(), dict())
+        self.assertEqual(backend.monitor.live_figures, 0)
+
+
+@skipIf(DebugToolbar is None, "django-debug-toolbar isn't installed")
+class FiguresPanelTests(TestCase):
+
+    def setUp(self):
+        self.model = create_model(
+            'PanelFigureModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure')},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        self.request = RequestFactory().get('/')
+        get_response = lambda request: HttpResponse()    # noqa
+        self.panel = FiguresPanel(DebugToolbar(self.request, get_response),
+                                  get_response)
+
+    def get_figures(self):
+        self.panel.generate_stats(self.request, HttpResponse())
+        return self.panel.get_stats()['figures']
+
+    def test_accessed_figures_are_listed(self):
+        render_cache.clear()
+        self.panel.enable_instrumentation()
+        try:
+            self.model.figure
+        finally:
+            self.panel.disable_instrumentation()
+        self.model.figure
+        figures = self.get_figures()
+        self.assertEqual([(figure['label'], figure['hit'])
+                          for figure in figures],
+                         [('django_matplotlib.PanelFigureModel.figure', False)])
+        self.assertTrue(self.panel.nav_subtitle.startswith('1 figures in '))
+        self.assertIn('django_matplotlib.PanelFigureModel.figure',
+                      self.panel.content)
+
+    def test_figures_of_other_requests_are_ignored(self):
+        self.panel.enable_instrumentation()
+        try:
+            thread = threading.Thread(target=lambda: self.model.figure)
+            thread.start()
+            thread.join()
+        finally:
+            self.panel.disable_instrumentation()
+        self.assertEqual(self.get_figures(), [])
+
+    def test_figures_of_async_requests_are_listed(self):
+        from asgiref.sync import sync_to_async
+
+        async def request():
+            # under ASGI, views run in other threads than the middleware
+            self.panel.enable_instrumentation()
+            try:
+                await sync_to_async(lambda: self.model.figure,
+                                    thread_sensitive=False)()
+            finally:
+                self.panel.disable_instrumentation()
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(request())
+        finally:
+            loop.close()
+        self.assertEqual(len(self.get_figures()), 1)
+
+
+class FigureStatsTests(TestCase):
+
+    def setUp(self):
+        self.model = create_model(
+            'FigureStatsModel',
+            fields={'figure': MatplotlibFigureField(figure='test_figure',
+                                                    fig_width=123)},
+            module='django_matplotlib.tests', app_label='django_matplotlib')
+        self.label = 'django_matplotlib.FigureStatsModel.figure'
+
+    def test_signal_is_sent(self):
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(kwargs)
+        figure_accessed.connect(receiver)
+        try:
+            render_cache.clear()
+            self.model.figure
+            self.model.figure
+        finally:
+            figure_accessed.disconnect(receiver)
+        self.assertEqual([kwargs['hit'] for kwargs in received], [False, True])
+        self.assertTrue({'load', 'hash', 'call', 'save', 'encode', 'total'} <=
+                        set(received[0]['timings']))
+
+    def test_statistics_are_collected(self):
+        stats.registry.reset()
+        render_cache.clear()
+        self.model.figure
+        self.model.figure
+        figure_stats = stats.registry.snapshot()[self.label]
+        self.assertEqual((figure_stats['hits'], figure_stats['misses']), (1, 1))
+        self.assertEqual(figure_stats['phases']['call']['count'], 1)
+        self.assertEqual(figure_stats['phases']['total']['count'], 2)
 
+    def test_statsd_adapter(self):
+        class Client:
+            def __init__(self):
+                self.metrics = []
 
+            def incr(self, name):
+                self.metrics.append(name)
 
+            def timing(self, name, ms):
+                self.metrics.append(name)
 
+        client = Client()
+        adapter = stats.StatsdAdapter(client, prefix='figs').connect()
+        try:
+            self.model.figure
+        finally:
+            adapter.disconnect()
+        self.assertIn('figs.%s.total' % self.label, client.metrics)
 
+    def test_logging_adapter(self):
+        adapter = stats.LoggingAdapter().connect()
+        try:
+            with self.assertLogs('django_matplotlib', level='DEBUG') as logs:
+                self.model.figure
+        finally:
+            adapter.disconnect()
+        self.assertIn(self.label, logs.output[0])
@@ -0,0 +1,9 @@
+from django.conf.urls import include
+try:
+    from django.urls import re_path
+except ImportError:
+    from django.conf.urls import url as re_path
+
+urlpatterns = [
+    re_path(r'^figures/', include('django_matplotlib.urls')),
+]
@@ -0,0 +1,20 @@
+try:
+    from django.urls import re_path
+except ImportError:
+    from django.conf.urls import url as re_path
+from django_matplotlib import views
+
+app_name = 'django_matplotlib'
+
+urlpatterns = [
+    re_path(r'^(?P<app_label>\w+)/(?P<model_name>\w+)/(?P<field_name>\w+)/$',
+            views.figure_view, name='figure'),
+    re_path(r'^(?P<app_label>\w+)/(?P<model_name>\w+)/(?P<field_name>\w+)/'
+            r'(?P<pk>[^/]+)/$', views.figure_view, name='figure'),
+    re_path(r'^(?P<app_label>\w+)/(?P<model_name>\w+)/(?P<field_name>\w+)/'
+            r'tiles/(?P<zoom>\d+)/(?P<x>\d+)/(?P<y>\d+)/$',
+            views.figure_tile_view, name='figure_tile'),
+    re_path(r'^(?P<app_label>\w+)/(?P<model_name>\w+)/(?P<field_name>\w+)/'
+            r'(?P<pk>[^/]+)/tiles/(?P<zoom>\d+)/(?P<x>\d+)/(?P<y>\d+)/$',
+            views.figure_tile_view, name='figure_tile'),
+]
@@ -0,0 +1,95 @@
+from django.apps import apps
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django_matplotlib.fields import MatplotlibFigureField, defaults
+
+
+def get_figure_field(app_label, model_name, field_name):
+    """ Returns model and its figure field or raises Http404 """
+
+    try:
+        model = apps.get_model(app_label, model_name)
+    except LookupError:
+        raise Http404("Model '%s.%s' doesn't exist." % (app_label, model_name))
+    for field in model._meta.private_fields:
+        if field.name == field_name and\
+                isinstance(field, MatplotlibFigureField):
+            return model, field
+    raise Http404("Figure field '%s' doesn't exist." % field_name)
+
+
+def get_instance(model, pk=None):
+    """ Returns model instance or raises Http404 """
+
+    if pk is None:
+        return None
+    try:
+        return model._default_manager.get(pk=pk)
+    except (model.DoesNotExist, ValueError):
+        raise Http404("Object doesn't exist.")
+
+
+def serve_figure(request, fig_object):
+    """ Returns response with rendered figure and caching headers """
+
+    if fig_object is None or fig_object.error:
+        raise Http404("Figure isn't available.")
+
+    etag = '"%s"' % fig_object.digest
+    last_modified = int(fig_object.modified)
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(fig_object.content,
+                                content_type=fig_object.content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, **defaults.DJANGO_MATPLOTLIB_CACHE_CONTROL)
+    return response
+
+
+@require_safe
+def figure_view(request, app_label, model_name, field_name, pk=None):
+    """Serves rendered figure of the field with `output_type='url'`.
+
+    Responses have a strong ETag (derived from figure's digest),
+    Last-Modified and Cache-Control (`DJANGO_MATPLOTLIB_CACHE_CONTROL`)
+    headers; conditional requests are answered with
+    `304 Not Modified`.
+
+    .. note::
+
+        The view doesn't check any permissions. If figures contain
+        sensitive data, wrap it (e.g. with
+        :func:`django.contrib.auth.decorators.login_required`) in your
+        URLconf instead of including `django_matplotlib.urls`.
+
+    """
+
+    model, field = get_figure_field(app_label, model_name, field_name)
+    if field.output_type != 'url':
+        raise Http404("Figure '%s' isn't served by url." % field_name)
+    fig_object = field.__get__(get_instance(model, pk), model)
+    return serve_figure(request, fig_object)
+
+
+@require_safe
+def figure_tile_view(request, app_label, model_name, field_name,
+                     zoom, x, y, pk=None):
+    """Serves tile `(x, y)` of zoom level `zoom` of the figure of the field
+    with `output_type='tiles'`. Tiles are rendered on demand and cached
+    (see :meth:`MatplotlibFigureField.get_tile`); responses have the same
+    caching headers as responses of :func:`figure_view`.
+    """
+
+    model, field = get_figure_field(app_label, model_name, field_name)
+    if field.output_type != 'tiles':
+        raise Http404("Figure '%s' isn't tiled." % field_name)
+    try:
+        fig_object = field.get_tile(get_instance(model, pk),
+                                    int(zoom), int(x), int(y))
+    except ValueError as e:
+        raise Http404(str(e))
+    return serve_figure(request, fig_object)
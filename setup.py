@@ -7,7 +7,7 @@ with open(README_FILE, 'r', encoding='utf-8') as d:
 
 
 setup(name='django-matplotlib',
-        packages=setuptools.find_packages(exclude=['docs', 'media']),
+        packages=setuptools.find_packages(exclude=['docs', 'media', 'benchmarks']),
         long_description_content_type='text/x-rst',
         version='0.1',
         description='Matplotlib field for Django',